@@ -1,21 +1,89 @@
-import tkinter as tk
-from math import hypot
-from random import randrange
-from time import time_ns
+import csv
+import json
+import os
+import random
+import struct
+import zipfile
+import zlib
+import numpy as np
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from heapq import heapify, heappush, heappop
+from math import atan2, ceil, gcd, hypot, sqrt
+from multiprocessing import Pool
+from random import Random, randrange
+from time import perf_counter_ns, time_ns
 from statistics import stdev, mean
+from solver_stats import SolverStats
+
+# Domains are bitmasks - bit k is set while colour k is still available. Maps use
+# four colours unless they are given another colours_count.
+ALL_COLORS = 0b1111
+
+VARIABLE_ORDERS = ('input', 'degree', 'mrv', 'dsatur')
+
+GENERATOR_MODES = ('nearest', 'delaunay')
+
+# returned instead of the time when a solver runs out of its budget
+TIMED_OUT = 'timed out'
+
+RESTART_STRATEGIES = ('luby', 'geometric')
+
+# Drawing colours, shared by the Tk window and the headless renderer. Node colours
+# cycle through PALETTE when a map uses more colours than it holds.
+PALETTE = ['#FF4500', '#ADFF2F', '#00BFFF', '#FFBBFF', '#FFD700', '#40E0D0', '#FA8072', '#DA70D6']
+UNCOLORED = '#FFFAFA'
+BACKGROUND = '#C4C4C4'
+
+class ValueOrder(dict):
+    # next_color[domain] is the first colour of the domain in the given order. Entries
+    # are filled in on first use, a full table would have 2 ** colours entries.
+    def __init__(self, colors: list):
+        super().__init__()
+        self.colors = list(colors)
+
+    def __missing__(self, domain: int):
+        color = next((color for color in self.colors if domain >> color & 1), None)
+        self[domain] = color
+        return color
+
+def value_order(colors: list):
+    return ValueOrder(colors)
+
+def luby(i: int):
+    # i-th element (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+    k = i.bit_length()
+    while (i != (1 << k) - 1):
+        i -= (1 << (k - 1)) - 1
+        k = i.bit_length()
+    return 1 << (k - 1)
+
+def restart_cutoffs(restarts: str = None, base: int = 100, factor: float = 1.5):
+    # Assignments allowed in each run, a single unlimited run without a strategy.
+    if (restarts is None):
+        yield None
+        return
+    if (restarts not in RESTART_STRATEGIES):
+        raise ValueError(f"Unknown restart strategy '{restarts}', expected one of {RESTART_STRATEGIES}.")
+    run = 1
+    while (True):
+        yield base * luby(run) if restarts == 'luby' else int(base * factor ** (run - 1))
+        run += 1
 
 class Node:
+    __slots__ = ('x', 'y', 'color', 'domain')
+
     def __init__(self, x: int, y: int):
         self.x = x
         self.y = y
         self.color = None
-        self.domain = [0, 1, 2, 3]
+        self.domain = ALL_COLORS
 
     def distance(self, node: 'Node'):
         return hypot(node.x - self.x, node.y - self.y)
 
-    def reset_node(self):
-        self.domain = [0, 1, 2, 3]
+    def reset_node(self, domain: int = ALL_COLORS):
+        self.domain = domain
         self.color = None
 
     def check_constraint(self, other: 'Node'):
@@ -37,6 +105,8 @@ class Node:
         return hash((self.x, self.y))
 
 class Path:
+    __slots__ = ('start_node', 'end_node')
+
     def __init__(self, start_node: Node, end_node: Node):
         self.start_node = start_node
         self.end_node = end_node
@@ -45,6 +115,21 @@ class Path:
         A, B = self.start_node, self.end_node
         C, D = path.start_node, path.end_node
 
+        dx0 = B.x - A.x
+        dx1 = D.x - C.x
+        dy0 = B.y - A.y
+        dy1 = D.y - C.y
+
+        p0 = dy1 * (D.x - A.x) - dx1 * (D.y - A.y)
+        p1 = dy1 * (D.x - B.x) - dx1 * (D.y - B.y)
+        # only segments on one line need the overlap checks below
+        if (p0 or p1):
+            if (p0 * p1 >= 0):
+                return False
+            p2 = dy0 * (B.x - C.x) - dx0 * (B.y - C.y)
+            p3 = dy0 * (B.x - D.x) - dx0 * (B.y - D.y)
+            return p2 * p3 < 0
+
         if (A.x == B.x and C.x == D.x):
             if (A.x != C.x):
                 return False
@@ -75,18 +160,47 @@ class Path:
                             B.distance(C) >= distance or B.distance(D) >= distance)
         except ZeroDivisionError:
             pass
+        return False
+
+    def intersect_many(self, segments: np.ndarray):
+        # Vectorized intersect() of this path against rows of [start x, start y, end x, end y].
+        A, B = self.start_node, self.end_node
+        Cx, Cy, Dx, Dy = segments[:, 0], segments[:, 1], segments[:, 2], segments[:, 3]
+        result = np.zeros(len(segments), dtype=bool)
+        vertical = Cx == Dx
+
+        if (A.x == B.x):
+            decided = vertical
+            min1 = min(A.y, B.y)
+            max1 = max(A.y, B.y)
+            minIntersection = np.maximum(min1, np.minimum(Cy, Dy))
+            maxIntersection = np.minimum(max1, np.maximum(Cy, Dy))
+            result[decided] = ((Cx == A.x) & (minIntersection < maxIntersection))[decided]
+        else:
+            a1 = (B.y - A.y) / (B.x - A.x)
+            b1 = A.y - a1 * A.x
+            with np.errstate(divide='ignore', invalid='ignore'):
+                a2 = (Dy - Cy) / (Dx - Cx)
+                b2 = Cy - a2 * Cx
+            decided = ~vertical & (a2 == a1) & (b2 == b1)
+            # collinear overlaps are rare, the scalar version keeps their distance rounding
+            for row in np.flatnonzero(decided):
+                x1, y1, x2, y2 = (int(value) for value in segments[row])
+                result[row] = self.intersect(Path(Node(x1, y1), Node(x2, y2)))
 
         dx0 = B.x - A.x
-        dx1 = D.x - C.x
+        dx1 = Dx - Cx
         dy0 = B.y - A.y
-        dy1 = D.y - C.y
+        dy1 = Dy - Cy
 
-        p0 = dy1 * (D.x - A.x) - dx1 * (D.y - A.y)
-        p1 = dy1 * (D.x - B.x) - dx1 * (D.y - B.y)
-        p2 = dy0 * (B.x - C.x) - dx0 * (B.y - C.y)
-        p3 = dy0 * (B.x - D.x) - dx0 * (B.y - D.y)
+        p0 = dy1 * (Dx - A.x) - dx1 * (Dy - A.y)
+        p1 = dy1 * (Dx - B.x) - dx1 * (Dy - B.y)
+        p2 = dy0 * (B.x - Cx) - dx0 * (B.y - Cy)
+        p3 = dy0 * (B.x - Dx) - dx0 * (B.y - Dy)
 
-        return bool((p0 * p1 < 0) & (p2 * p3 < 0))
+        crossing = (np.sign(p0) * np.sign(p1) < 0) & (np.sign(p2) * np.sign(p3) < 0)
+        result[~decided] = crossing[~decided]
+        return result
 
     def __str__(self):
         return f'[{self.start_node}, {self.end_node}]'
@@ -96,13 +210,508 @@ class Path:
             return NotImplemented
         return self.start_node == other.start_node and self.end_node == other.end_node
 
+
+def orient(ax: int, ay: int, bx: int, by: int, cx: int, cy: int):
+    # Negative when a, b, c turn counterclockwise in a y-up frame, exact for integers.
+    return (ay - cy) * (bx - cx) - (ax - cx) * (by - cy)
+
+def in_circle(ax: int, ay: int, bx: int, by: int, cx: int, cy: int, px: int, py: int):
+    dx = ax - px
+    dy = ay - py
+    ex = bx - px
+    ey = by - py
+    fx = cx - px
+    fy = cy - py
+    ap = dx * dx + dy * dy
+    bp = ex * ex + ey * ey
+    cp = fx * fx + fy * fy
+    return dx * (ey * cp - bp * fy) - dy * (ex * cp - bp * fx) + ap * (ex * fy - ey * fx) < 0
+
+def circumcenter(ax: int, ay: int, bx: int, by: int, cx: int, cy: int):
+    dx = bx - ax
+    dy = by - ay
+    ex = cx - ax
+    ey = cy - ay
+    determinant = dx * ey - dy * ex
+    if (determinant == 0):
+        return None
+    bl = dx * dx + dy * dy
+    cl = ex * ex + ey * ey
+    return ax + (ey * bl - dy * cl) / (2 * determinant), ay + (dx * cl - ex * bl) / (2 * determinant)
+
+def delaunay_edges(xs: list, ys: list):
+    # Sweep-hull Delaunay triangulation of distinct integer points in O(n log n): points
+    # are added in order of distance from a seed triangle, each one is joined to the
+    # convex hull edges it sees and the new triangles are made Delaunay by edge flips.
+    # Triangles are kept as halfedges, halfedges[e] is the twin of halfedge e in the
+    # neighbouring triangle or -1 on the hull. Returns the edges as pairs of indices.
+    n = len(xs)
+    if (n < 3):
+        return [(0, 1)] if n == 2 else []
+    center_x = (min(xs) + max(xs)) / 2
+    center_y = (min(ys) + max(ys)) / 2
+    i0 = min(range(n), key=lambda i: (xs[i] - center_x) ** 2 + (ys[i] - center_y) ** 2)
+    i1 = min((i for i in range(n) if i != i0), key=lambda i: (xs[i] - xs[i0]) ** 2 + (ys[i] - ys[i0]) ** 2)
+    i2 = None
+    min_radius = None
+    for i in range(n):
+        if (i == i0 or i == i1):
+            continue
+        center = circumcenter(xs[i0], ys[i0], xs[i1], ys[i1], xs[i], ys[i])
+        if (center is None):
+            continue
+        radius = (center[0] - xs[i0]) ** 2 + (center[1] - ys[i0]) ** 2
+        if (min_radius is None or radius < min_radius):
+            i2 = i
+            min_radius = radius
+    if (i2 is None):
+        # all points on a line, the only planar graph joins them in order along it
+        order = sorted(range(n), key=lambda i: (xs[i], ys[i]))
+        return list(zip(order, order[1:]))
+    if (orient(xs[i0], ys[i0], xs[i1], ys[i1], xs[i2], ys[i2]) < 0):
+        i1, i2 = i2, i1
+    center_x, center_y = circumcenter(xs[i0], ys[i0], xs[i1], ys[i1], xs[i2], ys[i2])
+    order = sorted(range(n), key=lambda i: (xs[i] - center_x) ** 2 + (ys[i] - center_y) ** 2)
+
+    # the hull is a doubly linked list of points, hull_triangle holds the halfedge of
+    # the hull edge starting at the point, the hash finds a hull point by angle
+    hull_previous = [0] * n
+    hull_next = [0] * n
+    hull_triangle = [0] * n
+    hash_size = max(ceil(sqrt(n)), 1)
+    hull_hash = [-1] * hash_size
+
+    def hash_key(x: int, y: int):
+        dx = x - center_x
+        dy = y - center_y
+        p = dx / (abs(dx) + abs(dy)) if dx or dy else 0
+        angle = (3 - p if dy > 0 else 1 + p) / 4
+        return int(angle * hash_size) % hash_size
+
+    triangles = []
+    halfedges = []
+
+    def link(a: int, b: int):
+        halfedges[a] = b
+        if (b != -1):
+            halfedges[b] = a
+
+    def add_triangle(i0: int, i1: int, i2: int, a: int, b: int, c: int):
+        t = len(triangles)
+        triangles.extend((i0, i1, i2))
+        halfedges.extend((-1, -1, -1))
+        link(t, a)
+        link(t + 1, b)
+        link(t + 2, c)
+        return t
+
+    def legalize(a: int):
+        # flips the edge of halfedge a while the opposite point lies inside the
+        # circumcircle, then checks the two edges the flip exposed
+        stack = []
+        while (True):
+            b = halfedges[a]
+            a0 = a - a % 3
+            ar = a0 + (a + 2) % 3
+            if (b == -1):
+                if (not stack):
+                    return ar
+                a = stack.pop()
+                continue
+            b0 = b - b % 3
+            al = a0 + (a + 1) % 3
+            bl = b0 + (b + 2) % 3
+            p0 = triangles[ar]
+            pr = triangles[a]
+            pl = triangles[al]
+            p1 = triangles[bl]
+            if (in_circle(xs[p0], ys[p0], xs[pr], ys[pr], xs[pl], ys[pl], xs[p1], ys[p1])):
+                triangles[a] = p1
+                triangles[b] = p0
+                hbl = halfedges[bl]
+                if (hbl == -1):
+                    # the flipped edge was on the hull, the hull has to point to a instead
+                    e = hull_start[0]
+                    while (True):
+                        if (hull_triangle[e] == bl):
+                            hull_triangle[e] = a
+                            break
+                        e = hull_previous[e]
+                        if (e == hull_start[0]):
+                            break
+                link(a, hbl)
+                link(b, halfedges[ar])
+                link(ar, bl)
+                stack.append(b0 + (b + 1) % 3)
+            else:
+                if (not stack):
+                    return ar
+                a = stack.pop()
+
+    hull_start = [i0]
+    hull_next[i0] = hull_previous[i2] = i1
+    hull_next[i1] = hull_previous[i0] = i2
+    hull_next[i2] = hull_previous[i1] = i0
+    hull_triangle[i0] = 0
+    hull_triangle[i1] = 1
+    hull_triangle[i2] = 2
+    hull_hash[hash_key(xs[i0], ys[i0])] = i0
+    hull_hash[hash_key(xs[i1], ys[i1])] = i1
+    hull_hash[hash_key(xs[i2], ys[i2])] = i2
+    add_triangle(i0, i1, i2, -1, -1, -1)
+
+    for i in order:
+        if (i == i0 or i == i1 or i == i2):
+            continue
+        x = xs[i]
+        y = ys[i]
+        # a visible hull edge, found from the hull point with the nearest angle
+        key = hash_key(x, y)
+        start = 0
+        for j in range(hash_size):
+            start = hull_hash[(key + j) % hash_size]
+            if (start != -1 and start != hull_next[start]):
+                break
+        start = hull_previous[start]
+        e = start
+        while (True):
+            q = hull_next[e]
+            if (orient(x, y, xs[e], ys[e], xs[q], ys[q]) < 0):
+                break
+            e = q
+            if (e == start):
+                e = -1
+                break
+        if (e == -1):
+            continue
+
+        t = add_triangle(e, i, hull_next[e], -1, -1, hull_triangle[e])
+        hull_triangle[i] = legalize(t + 2)
+        hull_triangle[e] = t
+        # walk forward and then backward along the hull while its edges are visible
+        k = hull_next[e]
+        while (True):
+            q = hull_next[k]
+            if (orient(x, y, xs[k], ys[k], xs[q], ys[q]) >= 0):
+                break
+            t = add_triangle(k, i, q, hull_triangle[i], -1, hull_triangle[k])
+            hull_triangle[i] = legalize(t + 2)
+            # removed from the hull
+            hull_next[k] = k
+            k = q
+        if (e == start):
+            while (True):
+                q = hull_previous[e]
+                if (orient(x, y, xs[q], ys[q], xs[e], ys[e]) >= 0):
+                    break
+                t = add_triangle(q, i, e, -1, hull_triangle[e], hull_triangle[q])
+                legalize(t + 2)
+                hull_triangle[q] = t
+                hull_next[e] = e
+                e = q
+        hull_start[0] = hull_previous[i] = e
+        hull_next[e] = hull_previous[k] = i
+        hull_next[i] = k
+        hull_hash[hash_key(x, y)] = i
+        hull_hash[hash_key(xs[e], ys[e])] = e
+
+    edges = []
+    for e, twin in enumerate(halfedges):
+        if (twin < e):
+            edges.append((triangles[e], triangles[e - e % 3 + (e + 1) % 3]))
+    return edges
+
+class NodeGrid:
+    def __init__(self, nodes: list, square_size: int, cell_size: int):
+        self.cell_size = cell_size
+        self.cells_count = square_size // cell_size + 1
+        self.cells = {}
+        for index, node in enumerate(nodes):
+            self.cells.setdefault((node.x // cell_size, node.y // cell_size), []).append((index, node))
+
+    def ring_cells(self, cx: int, cy: int, ring: int):
+        if (ring == 0):
+            return [(cx, cy)]
+        cells = []
+        for x in range(max(cx - ring, 0), min(cx + ring, self.cells_count - 1) + 1):
+            cells.append((x, cy - ring))
+            cells.append((x, cy + ring))
+        for y in range(max(cy - ring + 1, 0), min(cy + ring - 1, self.cells_count - 1) + 1):
+            cells.append((cx - ring, y))
+            cells.append((cx + ring, y))
+        return cells
+
+    def nearest(self, base_node: Node):
+        # Yields (distance, index, node) in the same order as sorting all the other
+        # nodes by distance, with ties kept in insertion order.
+        cx = base_node.x // self.cell_size
+        cy = base_node.y // self.cell_size
+        max_ring = max(cx, cy, self.cells_count - 1 - cx, self.cells_count - 1 - cy)
+        heap = []
+        for ring in range(max_ring + 1):
+            for cell in self.ring_cells(cx, cy, ring):
+                for index, node in self.cells.get(cell, ()):
+                    if (node is not base_node):
+                        heappush(heap, (node.distance(base_node), index, node))
+            # every node in the next rings is further than ring * cell_size
+            limit = ring * self.cell_size
+            while (heap and heap[0][0] <= limit):
+                yield heappop(heap)
+        while (heap):
+            yield heappop(heap)
+
+class SegmentGrid:
+    def __init__(self, cell_size: int):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.paths = []
+        self.coordinates = np.empty((64, 4), dtype=np.int64)
+
+    def cells_along(self, start_node: Node, end_node: Node):
+        # All cells touched by the segment, starting from the start_node side.
+        size = self.cell_size
+        x0, y0, x1, y1 = start_node.x, start_node.y, end_node.x, end_node.y
+        dx = x1 - x0
+        dy = y1 - y0
+        x_step = 1 if dx >= 0 else -1
+        y_step = 1 if dy >= 0 else -1
+        for column in range(x0 // size, x1 // size + x_step, x_step):
+            if (dx == 0):
+                row_start, row_end = y0 // size, y1 // size
+            else:
+                left = max(min(x0, x1), column * size)
+                right = min(max(x0, x1), (column + 1) * size)
+                row_left = (y0 * dx + dy * (left - x0)) // (dx * size)
+                row_right = (y0 * dx + dy * (right - x0)) // (dx * size)
+                if (x_step > 0):
+                    row_start, row_end = row_left, row_right
+                else:
+                    row_start, row_end = row_right, row_left
+            for row in range(row_start, row_end + y_step, y_step):
+                yield column, row
+
+    def add(self, path: Path):
+        index = len(self.paths)
+        self.paths.append(path)
+        if (index == len(self.coordinates)):
+            self.coordinates = np.concatenate((self.coordinates, np.empty_like(self.coordinates)))
+        self.coordinates[index] = (path.start_node.x, path.start_node.y, path.end_node.x, path.end_node.y)
+        for cell in self.cells_along(path.start_node, path.end_node):
+            self.cells.setdefault(cell, []).append(index)
+
+    def intersects(self, path: Path):
+        # Blocking paths are almost always found among the first few dozen paths next to
+        # the start node, so those are checked one by one and only long segments crossing
+        # crowded areas fall back to a single batched check of everything that is left.
+        checked = set()
+        remaining = []
+        for cell in self.cells_along(path.start_node, path.end_node):
+            for index in self.cells.get(cell, ()):
+                if (index in checked):
+                    continue
+                checked.add(index)
+                if (len(checked) <= 64):
+                    if (path.intersect(self.paths[index])):
+                        return True
+                else:
+                    remaining.append(index)
+        return bool(remaining) and bool(path.intersect_many(self.coordinates[remaining]).any())
+
+class CandidateScan:
+    # Position of a base node in its nearest-first candidate list. Candidates that
+    # were once blocked stay blocked because paths are never removed, so every scan
+    # continues where the previous one stopped.
+    def __init__(self, base_node: Node, node_grid: NodeGrid):
+        self.stream = node_grid.nearest(base_node)
+        self.ray_candidates = None
+        self.exhausted = False
+
+def cross(x1: int, y1: int, x2: int, y2: int):
+    return x1 * y2 - y1 * x2
+
+class VariableSelector:
+    # Hands out variables in the chosen order. Static orders follow a precomputed list,
+    # dynamic ones keep colour counts of the assigned neighbours of every variable and
+    # pick the next one from a lazily updated heap. Entries are pushed again whenever
+    # the key of a variable drops, older ones are skipped or refreshed when they come
+    # up, so a selection costs O(log n) instead of a pass over all variables. Searches
+    # call narrowed for every free variable whose domain they reduce.
+    def __init__(self, graph: dict, variable_order: str, tie_breaks: Random = None,
+                 colors_count: int = ALL_COLORS.bit_length(), symmetric: bool = False):
+        if (variable_order not in VARIABLE_ORDERS):
+            raise ValueError(f"Unknown variable order '{variable_order}', expected one of {VARIABLE_ORDERS}.")
+        self.graph = graph
+        self.variable_order = variable_order
+        self.dynamic = variable_order in ('mrv', 'dsatur')
+        self.variables = list(graph)
+        if (tie_breaks is not None):
+            # the sorts below are stable, so a shuffle only changes the ties
+            tie_breaks.shuffle(self.variables)
+        if (variable_order == 'degree'):
+            self.variables.sort(key=lambda variable: -len(graph[variable]))
+        self.positions = {}
+        if (self.dynamic):
+            # per variable state is kept in lists by the position in self.variables,
+            # which also breaks the ties
+            self.index = {variable: i for i, variable in enumerate(self.variables)}
+            self.neighbours = [[self.index[neighbour] for neighbour in graph[variable]]
+                               for variable in self.variables]
+            self.neighbour_colors = [[0] * colors_count for _ in self.variables]
+            self.used_masks = [0] * len(self.variables)
+            self.free_neighbours = [len(neighbours) for neighbours in self.neighbours]
+            self.selected = [False] * len(self.variables)
+            self.heap = [self.entry(i) for i in range(len(self.variables))]
+            heapify(self.heap)
+        # with symmetric set the searches call break_symmetry for every selected variable,
+        # color_uses counts the assigned variables of each colour and used is their mask
+        self.symmetric = symmetric
+        self.all_colors = (1 << colors_count) - 1
+        self.color_uses = [0] * colors_count
+        self.used = 0
+
+    def entry(self, i: int):
+        if (self.variable_order == 'mrv'):
+            return ((self.variables[i].domain & ~self.used_masks[i]).bit_count(), -len(self.neighbours[i]), i)
+        return (-self.used_masks[i].bit_count(), -self.free_neighbours[i], i)
+
+    def push(self, i: int):
+        heap = self.heap
+        if (len(heap) > 4 * len(self.variables) + 64):
+            # rebuilt once stale entries outnumber the free variables
+            heap[:] = [self.entry(j) for j in range(len(self.variables)) if not self.selected[j]]
+            heapify(heap)
+        heappush(heap, self.entry(i))
+
+    def select(self):
+        position = len(self.positions)
+        if (not self.dynamic):
+            variable = self.variables[position]
+        else:
+            heap = self.heap
+            while True:
+                key = heappop(heap)
+                i = key[2]
+                if (self.selected[i]):
+                    continue
+                current = self.entry(i)
+                if (current == key):
+                    break
+                heappush(heap, current)
+            self.selected[i] = True
+            for j in self.neighbours[i]:
+                self.free_neighbours[j] -= 1
+            variable = self.variables[i]
+        self.positions[variable] = position
+        return variable
+
+    def narrowed(self, variable: Node):
+        if (self.variable_order == 'mrv'):
+            self.push(self.index[variable])
+
+    def assign(self, variable: Node, color: int):
+        if (self.dynamic):
+            bit = 1 << color
+            for j in self.neighbours[self.index[variable]]:
+                counts = self.neighbour_colors[j]
+                if (variable.color is not None):
+                    counts[variable.color] -= 1
+                    if (not counts[variable.color]):
+                        self.used_masks[j] &= ~(1 << variable.color)
+                counts[color] += 1
+                if (counts[color] == 1):
+                    self.used_masks[j] |= bit
+                    if (not self.selected[j]):
+                        self.push(j)
+        if (variable.color is not None):
+            self.uncount(variable.color)
+        self.color_uses[color] += 1
+        self.used |= 1 << color
+        variable.color = color
+
+    def release(self, variable: Node):
+        if (self.dynamic):
+            i = self.index[variable]
+            for j in self.neighbours[i]:
+                if (variable.color is not None):
+                    counts = self.neighbour_colors[j]
+                    counts[variable.color] -= 1
+                    if (not counts[variable.color]):
+                        self.used_masks[j] &= ~(1 << variable.color)
+                self.free_neighbours[j] += 1
+                if (self.variable_order == 'dsatur' and not self.selected[j]):
+                    self.push(j)
+            self.selected[i] = False
+        if (variable.color is not None):
+            self.uncount(variable.color)
+        variable.color = None
+        del self.positions[variable]
+        if (self.dynamic):
+            self.push(i)
+
+    def uncount(self, color: int):
+        self.color_uses[color] -= 1
+        if (not self.color_uses[color]):
+            self.used &= ~(1 << color)
+
+    def break_symmetry(self, variable: Node, next_color: list):
+        # Colours no variable has yet are interchangeable, so a newly selected variable
+        # only keeps the first of them in the value order besides the used ones.
+        new_color = next_color[self.all_colors & ~self.used]
+        if (new_color is not None):
+            variable.domain &= self.used | 1 << new_color
+
+class NogoodStore:
+    # Bounded set of partial colourings that cannot be extended to a full one. Every
+    # nogood is indexed by its (variable, colour) pairs and the least recently used
+    # ones are evicted first.
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.nogoods = OrderedDict()
+        self.index = {}
+
+    def add(self, nogood: frozenset):
+        if (nogood in self.nogoods):
+            self.nogoods.move_to_end(nogood)
+            return
+        self.nogoods[nogood] = None
+        for pair in nogood:
+            self.index.setdefault(pair, set()).add(nogood)
+        if (len(self.nogoods) > self.limit):
+            evicted, _ = self.nogoods.popitem(last=False)
+            for pair in evicted:
+                self.index[pair].discard(evicted)
+
+    def violated(self, variable: Node, color: int, positions: dict):
+        # Returns the other variables of a nogood that giving the colour to the variable
+        # would complete, or None.
+        for nogood in self.index.get((variable, color), ()):
+            if (all(other is variable or (other in positions and other.color == other_color)
+                    for other, other_color in nogood)):
+                self.nogoods.move_to_end(nogood)
+                return [other for other, _ in nogood if other is not variable]
+        return None
+
 class Map:
-    def __init__(self, square_size: int):
+    def __init__(self, square_size: int, colors_count: int = ALL_COLORS.bit_length()):
         self.graph = {}
         self.paths = []
         self.square_size = square_size
+        self.colors_count = colors_count
+        # counters of the last colouring method
+        self.stats = SolverStats()
+        # (paths, {(start, end): index}) built on the first edit, see path_index
+        self.path_slots = None
 
-    def random_graph(self, nodes_count: int):
+    def random_graph(self, nodes_count: int, mode: str = 'nearest', average_degree: float = None):
+        # 'nearest' keeps joining every node to its nearest node it can reach without
+        # crossing a path until nothing changes, 'delaunay' triangulates the same points
+        # in O(n log n). Both give maximal planar graphs, with average_degree random
+        # paths are removed afterwards until the average degree is at most that.
+        # 'nearest' is meant for small maps: 10 000 nodes take about 25 s on a 1000x1000
+        # square and 110 s on a 200x200 one, where more of the candidate paths are
+        # collinear. Larger maps should use 'delaunay', 100 000 nodes take about 5 s.
+        if (mode not in GENERATOR_MODES):
+            raise ValueError(f"Unknown generator mode '{mode}', expected one of {GENERATOR_MODES}.")
         if (self.square_size ** 2 < nodes_count):
             raise ValueError(f"{nodes_count} nodes will not fit in {self.square_size}x{self.square_size} square.")
         self.graph = {}
@@ -114,76 +723,218 @@ class Map:
                 if (new_node not in self.graph):
                     self.graph[Node(x, y)] = []
                     break
+        nodes = list(self.graph)
+        if (mode == 'delaunay'):
+            edges = delaunay_edges([node.x for node in nodes], [node.y for node in nodes])
+            self.paths = [Path(nodes[i], nodes[j]) for i, j in edges]
+        else:
+            self.paths = self.nearest_paths(nodes)
+        if (average_degree is not None and len(self.paths) > average_degree * len(nodes) / 2):
+            kept = random.sample(range(len(self.paths)), int(average_degree * len(nodes) / 2))
+            self.paths = [self.paths[index] for index in sorted(kept)]
+        # neighbours are listed in the order their paths were made
+        for path in self.paths:
+            self.graph[path.start_node].append(path.end_node)
+            self.graph[path.end_node].append(path.start_node)
+
+    def nearest_paths(self, nodes: list):
+        positions = {(node.x, node.y): index for index, node in enumerate(nodes)}
+        cell_size = max(1, ceil(self.square_size * sqrt(2 / max(len(nodes), 1))))
+        node_grid = NodeGrid(nodes, self.square_size, cell_size)
+        segment_grid = SegmentGrid(cell_size)
+        adjacency = [set() for _ in nodes]
+        scans = [CandidateScan(node, node_grid) for node in nodes]
         paths = []
         nothing_changed = 0
-        while (nothing_changed < len(self.graph)):
-            for base_node in self.graph:
-                distances = {}
-                for node in self.graph:
-                    if (node == base_node):
-                        continue
-                    is_already_connected = False
-                    for connected_node in self.graph[base_node]:
-                        if (connected_node == node):
-                            is_already_connected = True
-                            break
-                    if (is_already_connected):
-                        continue
-                    distances[node] = node.distance(base_node)
-                sorted_distances = sorted(distances.items(), key=lambda item: item[1])
-                for node, _ in sorted_distances:
+        while (nothing_changed < len(nodes)):
+            for base_index, base_node in enumerate(nodes):
+                node_index = self.next_candidate(scans[base_index], base_index, nodes, positions,
+                                                 adjacency, segment_grid)
+                if (node_index is not None):
+                    node = nodes[node_index]
                     current_path = Path(base_node, node)
-                    is_intersecting = False
-                    for path in paths:
-                        if (current_path.intersect(path)):
-                            is_intersecting = True
-                            break
-                    if (is_intersecting):
-                        continue
                     paths.append(current_path)
-                    self.graph[base_node].append(node)
-                    self.graph[node].append(base_node)
+                    segment_grid.add(current_path)
+                    adjacency[base_index].add(node_index)
+                    adjacency[node_index].add(base_index)
                     nothing_changed = 0
-                    break
                 nothing_changed += 1
-        self.paths = paths
+        return paths
+
+    def closed_wedges(self, base_index: int, nodes: list, adjacency: list):
+        # Splits the plane around the base node into wedges between consecutive
+        # neighbour directions. A wedge is closed when it is narrower than 180 degrees
+        # and an edge joins neighbours lying on its two sides - any segment from the
+        # base node to a point strictly inside it and beyond that edge crosses it.
+        base_node = nodes[base_index]
+        directions = {}
+        for index in adjacency[base_index]:
+            dx = nodes[index].x - base_node.x
+            dy = nodes[index].y - base_node.y
+            divisor = gcd(dx, dy)
+            directions.setdefault((dx // divisor, dy // divisor), []).append(index)
+        rays = sorted(directions, key=lambda direction: atan2(direction[1], direction[0]))
+        angles = [atan2(y, x) for x, y in rays]
+        wedges = []
+        for k, first_ray in enumerate(rays):
+            second_ray = rays[(k + 1) % len(rays)]
+            wedge = None
+            if (cross(*first_ray, *second_ray) > 0):
+                for u in directions[first_ray]:
+                    for w in directions[second_ray]:
+                        if (w in adjacency[u]):
+                            wedge = (first_ray, second_ray, nodes[u], nodes[w])
+                            break
+                    if (wedge is not None):
+                        break
+            wedges.append(wedge)
+        enclosed = len(rays) >= 3 and all(wedge is not None for wedge in wedges)
+        return rays, angles, wedges, enclosed
 
     @staticmethod
-    def domains_not_empty(variables: list):
-        for variable in variables:
-            if (not variable.domain):
-                return False
-        return True
+    def is_shadowed(base_node: Node, node: Node, angles: list, wedges: list):
+        if (not wedges):
+            return False
+        vx = node.x - base_node.x
+        vy = node.y - base_node.y
+        wedge = wedges[bisect_right(angles, atan2(vy, vx)) - 1]
+        if (wedge is None):
+            return False
+        first_ray, second_ray, u, w = wedge
+        if (cross(*first_ray, vx, vy) <= 0 or cross(vx, vy, *second_ray) <= 0):
+            return False
+        base_side = cross(w.x - u.x, w.y - u.y, base_node.x - u.x, base_node.y - u.y)
+        node_side = cross(w.x - u.x, w.y - u.y, node.x - u.x, node.y - u.y)
+        return base_side * node_side < 0
+
+    def ray_candidates(self, base_node: Node, rays: list, nodes: list, positions: dict, key: tuple):
+        candidates = []
+        for step_x, step_y in rays:
+            x = base_node.x + step_x
+            y = base_node.y + step_y
+            while (0 <= x < self.square_size and 0 <= y < self.square_size):
+                index = positions.get((x, y))
+                if (index is not None):
+                    candidate_key = (nodes[index].distance(base_node), index)
+                    if (candidate_key >= key):
+                        candidates.append(candidate_key)
+                x += step_x
+                y += step_y
+        candidates.sort(reverse=True)
+        return candidates
+
+    def next_candidate(self, scan: CandidateScan, base_index: int, nodes: list, positions: dict,
+                       adjacency: list, segment_grid: SegmentGrid):
+        # Returns the index of the nearest node that can be connected to the base node
+        # without crossing any path, or None once there is none left.
+        if (scan.exhausted):
+            return None
+        base_node = nodes[base_index]
+        rays, angles, wedges, enclosed = self.closed_wedges(base_index, nodes, adjacency)
+        radius = max((nodes[index].distance(base_node) for index in adjacency[base_index]), default=0)
+        while (True):
+            if (scan.ray_candidates is not None):
+                # inside a closed fan of edges, only nodes hidden right behind a
+                # neighbour can still be reached
+                if (not scan.ray_candidates):
+                    break
+                distance, index = scan.ray_candidates.pop()
+            else:
+                item = next(scan.stream, None)
+                if (item is None):
+                    break
+                distance, index, _ = item
+                if (enclosed and distance > radius):
+                    scan.ray_candidates = self.ray_candidates(base_node, rays, nodes, positions,
+                                                              (distance, index))
+                    continue
+            if (index in adjacency[base_index]):
+                continue
+            node = nodes[index]
+            if (Map.is_shadowed(base_node, node, angles, wedges)):
+                continue
+            if (not segment_grid.intersects(Path(base_node, node))):
+                return index
+        scan.exhausted = True
+        return None
+
+    @property
+    def all_colors(self):
+        # domain with every colour of the map
+        return (1 << self.colors_count) - 1
 
     def reset_map_state(self):
+        all_colors = self.all_colors
         for variable in self.graph:
-            variable.reset_node()
+            variable.reset_node(all_colors)
 
-    def color_backtracking(self):
-        i = 0
-        t = 0
-        backtracks = 0
-        iterations = 0
+    def solve(self, search: callable, variable_order: str = 'input', stats: SolverStats = None,
+              max_assignments: int = None, timeout: int = None, restarts: str = None, restart_base: int = None,
+              seed: int = None, break_symmetry: bool = False):
+        # Runs a search within the budget. Restarts after the first run shuffle the tie-breaks
+        # and colour order, with cutoffs in multiples of twice the node count by default.
+        # break_symmetry searches colourings that only differ by a renaming of colours once.
+        # Returns (time, iterations), (None, None) when the map cannot be coloured and
+        # (TIMED_OUT, iterations) when the budget ran out.
+        stats = self.start_stats(stats)
+        stats.set_budget(max_assignments, timeout)
         start = time_ns() // 1000000
-        variables = list(self.graph)
-        while i < len(self.graph):
-            current_variable = variables[i]
+        tie_breaks = Random(seed) if restarts is not None else None
+        colors = list(range(self.colors_count))
+        if (restart_base is None):
+            restart_base = max(2 * len(self.graph), 1)
+        for run, cutoff in enumerate(restart_cutoffs(restarts, restart_base)):
+            # every run starts from full domains of colors_count colours
+            self.reset_map_state()
+            if (run > 0):
+                tie_breaks.shuffle(colors)
+                stats.restarts += 1
+            stats.limit(cutoff)
+            selector = VariableSelector(self.graph, variable_order, tie_breaks if run > 0 else None,
+                                        self.colors_count, break_symmetry)
+            colored = search(selector, value_order(colors))
+            if (colored):
+                return (time_ns() // 1000000 - start), stats.assignments
+            if (colored is not None):
+                return None, None
+            if (stats.timed_out):
+                return TIMED_OUT, stats.assignments
 
-            if ((time_ns() // 1000000 - start) // 5000 > t):
-                print(f'{int(time_ns() // 1000000 - start)}ms', f'{iterations} iterations')
-                t += 1
+    def start_stats(self, stats: SolverStats = None):
+        # the counters of the last run stay available in self.stats
+        self.stats = stats if stats is not None else SolverStats()
+        return self.stats
+
+    def color_backtracking(self, variable_order: str = 'input', stats: SolverStats = None, **budget):
+        return self.solve(self.backtracking_search, variable_order, stats, **budget)
+
+    def backtracking_search(self, selector: VariableSelector, next_color: list):
+        # Returns True when coloured, False when the map cannot be coloured and None
+        # when the run was stopped by the budget or a restart.
+        i = 0
+        stats = self.stats
+        order = []
+        while i < len(self.graph):
+            if (i == len(order)):
+                order.append(selector.select())
+                if (selector.symmetric):
+                    selector.break_symmetry(order[i], next_color)
+            current_variable = order[i]
 
             if (not current_variable.domain):
                 if (i == 0):
-                    # print("Graph cannot be colored")
-                    return None, None
-                current_variable.reset_node()
+                    return False
+                selector.release(order.pop())
+                current_variable.reset_node(self.all_colors)
                 i -= 1
-                backtracks += 1
+                stats.backtracks += 1
             else:
-                iterations += 1
-                current_variable.color = current_variable.domain[0]
-                current_variable.domain = current_variable.domain[1:]
+                stats.assignments += 1
+                if (stats.assignments == stats.next_report and stats.report()):
+                    return None
+                color = next_color[current_variable.domain]
+                selector.assign(current_variable, color)
+                current_variable.domain &= ~(1 << color)
                 constraints_satisfied = True
                 for variable in self.graph[current_variable]:
                     if (not variable.check_constraint(current_variable)):
@@ -191,118 +942,1342 @@ class Map:
                         break
                 if (constraints_satisfied):
                     i += 1
-        return (time_ns() // 1000000 - start), iterations
+        return True
 
-    def color_backtracking_with_forward_checking(self):
+    def color_backjumping(self, variable_order: str = 'input', nogood_limit: int = 0, stats: SolverStats = None,
+                          **budget):
+        # Conflict-directed backjumping: every position keeps the earlier positions that
+        # ruled out one of its colours, and an exhausted variable jumps straight back to
+        # the latest of them. With nogood_limit > 0 the conflict sets are also kept as
+        # nogoods, so the same dead end is not searched again.
+        def search(selector: VariableSelector, next_color: list):
+            return self.backjumping_search(selector, next_color, nogood_limit)
+        return self.solve(search, variable_order, stats, **budget)
+
+    def backjumping_search(self, selector: VariableSelector, next_color: list, nogood_limit: int = 0):
         i = 0
-        t = 0
-        iterations = 0
-        backtracks = 0
-        start = time_ns() // 1000000
-        variables = list(self.graph)
-        historical_domains = {}
-        for variable in variables:
-            historical_domains[variable] = [variable.domain.copy()]
-        while i < len(variables):
-            current_variable = variables[i]
-
-            if ((time_ns() // 1000000 - start) // 5000 > t):
-                print(f'{int(time_ns() // 1000000 - start)}ms', f'{iterations} iterations')
-                t += 1
-
-            if (not Map.domains_not_empty(variables[i:])):
+        stats = self.stats
+        nogoods = NogoodStore(nogood_limit) if nogood_limit > 0 else None
+        order = []
+        conflicts = []
+        while i < len(self.graph):
+            if (i == len(order)):
+                order.append(selector.select())
+                conflicts.append(set())
+                # a colour ruled out as a renaming of the first unused one is refuted by
+                # the same conflict set, so backjumping stays sound
+                if (selector.symmetric):
+                    selector.break_symmetry(order[i], next_color)
+            current_variable = order[i]
+
+            if (not current_variable.domain):
+                conflict = conflicts[i]
+                if (not conflict):
+                    return False
+                if (nogoods is not None):
+                    nogoods.add(frozenset((order[position], order[position].color) for position in conflict))
+                jump = max(conflict)
+                conflicts[jump] |= conflict
+                conflicts[jump].discard(jump)
+                while (len(order) > jump + 1):
+                    variable = order.pop()
+                    conflicts.pop()
+                    selector.release(variable)
+                    variable.reset_node(self.all_colors)
+                i = jump
+                stats.backtracks += 1
+            else:
+                stats.assignments += 1
+                if (stats.assignments == stats.next_report and stats.report()):
+                    return None
+                color = next_color[current_variable.domain]
+                current_variable.domain &= ~(1 << color)
+                culprit = None
+                for variable in self.graph[current_variable]:
+                    if (variable.color == color and variable in selector.positions):
+                        position = selector.positions[variable]
+                        if (position < i and (culprit is None or position < culprit)):
+                            culprit = position
+                if (culprit is not None):
+                    conflicts[i].add(culprit)
+                    continue
+                if (nogoods is not None):
+                    others = nogoods.violated(current_variable, color, selector.positions)
+                    if (others is not None):
+                        conflicts[i].update(selector.positions[variable] for variable in others)
+                        continue
+                selector.assign(current_variable, color)
+                i += 1
+        return True
+
+    def color_backtracking_with_forward_checking(self, variable_order: str = 'input', stats: SolverStats = None,
+                                                 **budget):
+        return self.color_with_propagation(self.forward_check, variable_order, stats, **budget)
+
+    def color_maintaining_arc_consistency(self, variable_order: str = 'input', stats: SolverStats = None, **budget):
+        return self.color_with_propagation(self.maintain_arc_consistency, variable_order, stats, **budget)
+
+    def forward_check(self, variable: Node, selector: VariableSelector, trail: list):
+        # Removes the colour of the assigned variable from its unassigned neighbours,
+        # returns True when one of them has no colour left.
+        mask = 1 << variable.color
+        for neighbour in self.graph[variable]:
+            if (neighbour.domain & mask and neighbour not in selector.positions):
+                trail.append((neighbour, neighbour.domain))
+                neighbour.domain &= ~mask
+                if (not neighbour.domain):
+                    return True
+                selector.narrowed(neighbour)
+        return False
+
+    def maintain_arc_consistency(self, variable: Node, selector: VariableSelector, trail: list):
+        # AC-3 over the arcs of the assigned variable. With "different colour" constraints
+        # a value loses its support only when the other domain is reduced to that single
+        # value, so only arcs towards variables that became singletons are queued.
+        positions = selector.positions
+        queue = deque((neighbour, variable) for neighbour in self.graph[variable] if neighbour not in positions)
+        while (queue):
+            revised, support = queue.popleft()
+            if (revised in positions):
+                continue
+            mask = 1 << support.color if support in positions else support.domain
+            if (mask & (mask - 1) or not revised.domain & mask):
+                continue
+            trail.append((revised, revised.domain))
+            revised.domain &= ~mask
+            if (not revised.domain):
+                return True
+            selector.narrowed(revised)
+            if (not revised.domain & (revised.domain - 1)):
+                for neighbour in self.graph[revised]:
+                    if (neighbour is not support and neighbour not in positions):
+                        queue.append((neighbour, revised))
+        return False
+
+    def color_with_propagation(self, propagate: callable, variable_order: str = 'input', stats: SolverStats = None,
+                               **budget):
+        def search(selector: VariableSelector, next_color: list):
+            return self.propagation_search(selector, next_color, propagate)
+        return self.solve(search, variable_order, stats, **budget)
+
+    def propagation_search(self, selector: VariableSelector, next_color: list, propagate: callable):
+        i = 0
+        stats = self.stats
+        order = []
+        # (variable, previous domain) for every domain narrowed by propagation,
+        # levels hold the trail length at the time of each assignment
+        trail = []
+        levels = []
+        wiped_out = False
+        while i < len(self.graph):
+            if (i == len(order) and not wiped_out):
+                current_variable = selector.select()
+                order.append(current_variable)
+                # the variable gets this domain back if it runs out of values
+                trail.append((current_variable, current_variable.domain))
+                if (selector.symmetric):
+                    selector.break_symmetry(current_variable, next_color)
+
+            # later domains can only be emptied by the assignment that led here
+            if (wiped_out or not order[i].domain):
                 if (i == 0):
-                    # print("Graph cannot be colored")
-                    return None, None
-                for j, variable in enumerate(variables):
-                    historical_domains[variable].pop()
-                    if (j >= i):
-                        variable.domain = historical_domains[variable][-1].copy()
-                        variable.color = None
+                    return False
+                level = levels.pop()
+                while (len(trail) > level):
+                    variable, domain = trail.pop()
+                    variable.domain = domain
+                if (i < len(order)):
+                    selector.release(order.pop())
+                wiped_out = False
                 i -= 1
-                backtracks += 1
+                stats.backtracks += 1
             else:
-                iterations += 1
-                current_variable.color = current_variable.domain[0]
-                current_variable.domain = current_variable.domain[1:]
-                constraints_satisfied = True
-                for variable in self.graph[current_variable]:
-                    if (current_variable.color in variable.domain and variables.index(variable) > variables.index(current_variable)):
-                        variable.domain.remove(current_variable.color)
-                    if (not variable.check_constraint(current_variable)):
-                        constraints_satisfied = False
-                for variable in variables:
-                    historical_domains[variable].append(variable.domain.copy())
-                if (constraints_satisfied):
-                    i += 1
+                current_variable = order[i]
+                stats.assignments += 1
+                if (stats.assignments == stats.next_report and stats.report()):
+                    return None
+                color = next_color[current_variable.domain]
+                selector.assign(current_variable, color)
+                current_variable.domain &= ~(1 << color)
+                levels.append(len(trail))
+                # propagation keeps every assignment consistent with the earlier ones
+                pruned = len(trail)
+                if (stats.time_propagation):
+                    propagation_start = perf_counter_ns()
+                    wiped_out = propagate(current_variable, selector, trail)
+                    stats.propagation_time += perf_counter_ns() - propagation_start
+                else:
+                    wiped_out = propagate(current_variable, selector, trail)
+                stats.prunings += len(trail) - pruned
+                i += 1
+        return True
+
+    def color_min_conflicts(self, variable_order: str = 'dsatur', stats: SolverStats = None,
+                            max_assignments: int = None, timeout: int = None, seed: int = None,
+                            tabu_tenure: int = 0, sample_size: int = 64):
+        # Local search, see min_conflicts. Returns (time, iterations) or
+        # (TIMED_OUT, iterations), iterations are the recolouring steps.
+        stats = self.start_stats(stats)
+        stats.set_budget(max_assignments, timeout)
+        start = time_ns() // 1000000
+        nodes = list(self.graph)
+        index = {node: i for i, node in enumerate(nodes)}
+        neighbours = [[index[neighbour] for neighbour in self.graph[node]] for node in nodes]
+        colors = min_conflicts(neighbours, stats, variable_order, seed, tabu_tenure, sample_size,
+                               colors_count=self.colors_count)
+        for node, color in zip(nodes, colors):
+            node.color = color
+        if (stats.timed_out):
+            return TIMED_OUT, stats.assignments
+        return (time_ns() // 1000000 - start), stats.assignments
+
+    def color_kernelized(self, method: str = 'color_backtracking_with_forward_checking', k: int = None,
+                         biconnected: bool = True, processes: int = 1, **options):
+        # Nodes with fewer than k neighbours can always be coloured once the rest is, so
+        # they are stripped repeatedly and coloured last in reverse order. The remaining
+        # core is split into connected or biconnected components, which are coloured on
+        # their own with the given color_* method (in a process pool with processes > 1)
+        # and joined by permuting colours at the cut vertices. k defaults to the number
+        # of colours, options go to the method of every component. Returns the same
+        # (time, iterations) shape as the method, iterations summed over components.
+        if (not method.startswith('color_') or method == 'color_kernelized' or not hasattr(self, method)):
+            raise ValueError(f"Unknown colouring method '{method}'.")
+        start = time_ns() // 1000000
+        if (k is None):
+            k = self.colors_count
+        removed = self.peel(k)
+        core = {node: [neighbour for neighbour in self.graph[node] if neighbour not in removed]
+                for node in self.graph if node not in removed}
+        components = biconnected_components(core) if biconnected else connected_components(core)
+        # components keep the order of the map, which the 'input' variable order follows
+        positions = {node: i for i, node in enumerate(core)}
+        for component in components:
+            component.sort(key=positions.__getitem__)
+        jobs = []
+        for component in components:
+            index = {node: i for i, node in enumerate(component)}
+            adjacency = [[index[neighbour] for neighbour in core[node] if neighbour in index] for node in component]
+            jobs.append((method, self.square_size, self.colors_count, [(node.x, node.y) for node in component],
+                         adjacency, options))
+        if (processes > 1 and len(jobs) > 1):
+            with Pool(processes) as pool:
+                results = pool.map(solve_component, jobs)
+        else:
+            results = [solve_component(job) for job in jobs]
+
+        self.stats = SolverStats()
+        iterations = 0
+        timed_out = False
+        colors = {}
+        for time, component_iterations, _, counters in results:
+            for key, value in counters.items():
+                setattr(self.stats, key, getattr(self.stats, key) + value)
+            if (time is None):
+                return None, None
+            timed_out |= time == TIMED_OUT
+            iterations += component_iterations
+        if (timed_out):
+            return TIMED_OUT, iterations
+        # Components come out of the depth first search after the ones hanging below
+        # them, so in reverse every component shares at most one node, its cut vertex,
+        # with those already coloured.
+        for (_, _, component_colors, _), component in reversed(list(zip(results, components))):
+            component_colors = {node: component_colors[(node.x, node.y)] for node in component}
+            shared = next((node for node in component if node in colors), None)
+            if (shared is not None and colors[shared] != component_colors[shared]):
+                old, new = component_colors[shared], colors[shared]
+                component_colors = {node: new if color == old else old if color == new else color
+                                    for node, color in component_colors.items()}
+            colors.update(component_colors)
+        for node, color in colors.items():
+            node.color = color
+        for node in reversed(removed):
+            used = 0
+            for neighbour in self.graph[node]:
+                if (neighbour.color is not None):
+                    used |= 1 << neighbour.color
+            free = self.all_colors & ~used
+            # fewer than k coloured neighbours leave a colour free unless k > colours
+            if (not free):
+                return None, None
+            node.color = (free & -free).bit_length() - 1
         return (time_ns() // 1000000 - start), iterations
-                
+
+    def peel(self, k: int):
+        # Repeatedly removes nodes with fewer than k remaining neighbours, returns them
+        # in removal order as a dict used as an ordered set.
+        degrees = {node: len(neighbours) for node, neighbours in self.graph.items()}
+        removed = {}
+        stack = [node for node, degree in degrees.items() if degree < k]
+        while (stack):
+            node = stack.pop()
+            if (node in removed):
+                continue
+            removed[node] = None
+            for neighbour in self.graph[node]:
+                if (neighbour not in removed):
+                    degrees[neighbour] -= 1
+                    if (degrees[neighbour] == k - 1):
+                        stack.append(neighbour)
+        return list(removed)
+
+    def chromatic_number(self, method: str = 'color_backtracking_with_forward_checking',
+                         variable_order: str = 'dsatur', local_steps: int = None, seed: int = None,
+                         component_method: str = None, **budget):
+        # Smallest number of colours, searched downwards from the current colouring (or
+        # colors_count). Min-conflicts tries every step first, the exact method with
+        # symmetry breaking and the budget only runs when it fails, component_method is the
+        # one color_kernelized runs on its components. Returns (colours, time, iterations),
+        # (None, None, None) when colors_count colours are not enough and time TIMED_OUT
+        # when an exact step ran out of budget.
+        if ('color_min_conflicts' in (method, component_method)):
+            raise ValueError("'color_min_conflicts' is a local search and cannot prove that "
+                             "fewer colours are not enough, chromatic_number needs an exact method.")
+        if (not method.startswith('color_') or not hasattr(self, method)):
+            raise ValueError(f"Unknown exact colouring method '{method}'.")
+        if (component_method is not None and method != 'color_kernelized'):
+            raise ValueError("component_method only applies to 'color_kernelized'.")
+        arguments = (component_method,) if component_method is not None else ()
+        start = time_ns() // 1000000
+        colors_count = self.colors_count
+        nodes = list(self.graph)
+        index = {node: i for i, node in enumerate(nodes)}
+        neighbours = [[index[neighbour] for neighbour in self.graph[node]] for node in nodes]
+        if (local_steps is None):
+            local_steps = 10 * len(nodes)
+        k = None
+        if (all(node.color is not None and node.color < colors_count and
+                all(neighbour.color != node.color for neighbour in self.graph[node]) for node in nodes)):
+            # the colours in use become 0..k-1, so the last one is dropped first
+            labels = {color: label for label, color in enumerate(sorted({node.color for node in nodes}))}
+            for node in nodes:
+                node.color = labels[node.color]
+            k = len(labels)
+        target = colors_count if k is None else k - 1
+        lower_bound = self.clique_bound()
+        iterations = 0
+        try:
+            while (target >= lower_bound):
+                self.colors_count = target
+                starts = [(None, local_steps)]
+                if (k is not None):
+                    # nodes of the dropped colour take the colour least used around them
+                    colors = [node.color for node in nodes]
+                    for i, color in enumerate(colors):
+                        if (color == target):
+                            used = [0] * target
+                            for j in neighbours[i]:
+                                if (colors[j] < target):
+                                    used[colors[j]] += 1
+                            colors[i] = used.index(min(used))
+                    starts.insert(0, (colors, max(local_steps // 5, 1)))
+                found = None
+                for colors, steps in starts:
+                    stats = SolverStats()
+                    stats.set_budget(steps)
+                    colors = min_conflicts(neighbours, stats, variable_order, seed, colors=colors, colors_count=target)
+                    iterations += stats.assignments
+                    if (not stats.timed_out):
+                        found = colors
+                        break
+                if (found is not None):
+                    for node, color in zip(nodes, found):
+                        node.color = color
+                else:
+                    previous = [node.color for node in nodes]
+                    time, step_iterations = getattr(self, method)(*arguments, variable_order=variable_order,
+                                                                  seed=seed, break_symmetry=True, **budget)
+                    if (time is None or time == TIMED_OUT):
+                        for node, color in zip(nodes, previous):
+                            node.color = color
+                        if (time == TIMED_OUT):
+                            return k, TIMED_OUT, iterations + step_iterations
+                        break
+                    iterations += step_iterations
+                k = target
+                target -= 1
+        finally:
+            self.colors_count = colors_count
+        if (k is None):
+            return None, None, None
+        return k, (time_ns() // 1000000 - start), iterations
+
+    def clique_bound(self):
+        # Size of the largest clique found by greedily growing one around every node,
+        # no colouring can use fewer colours.
+        adjacent = {node: set(neighbours) for node, neighbours in self.graph.items()}
+        best = 1 if self.graph else 0
+        for node, neighbours in self.graph.items():
+            clique = []
+            for neighbour in sorted(neighbours, key=lambda neighbour: -len(self.graph[neighbour])):
+                if (all(neighbour in adjacent[member] for member in clique)):
+                    clique.append(neighbour)
+            best = max(best, len(clique) + 1)
+        return best
+
+    def add_node(self, node: Node, neighbours: list = (), **options):
+        # Adds the node joined to the given nodes of the map and colours it, options go to
+        # repair. Returns the number of nodes whose colour changed, see repair.
+        if (node in self.graph):
+            raise ValueError(f"Node {node} is already on the map.")
+        # checked before anything changes, so a failed call leaves the map as it was
+        for neighbour in neighbours:
+            if (neighbour not in self.graph):
+                raise ValueError(f"Path {node} - {neighbour} joins a node that is not on the map.")
+        if (len(set(neighbours)) != len(neighbours)):
+            raise ValueError(f"Node {node} cannot be joined to the same node twice.")
+        self.graph[node] = []
+        for neighbour in neighbours:
+            self.join(node, neighbour)
+        return self.repair([node], **options)
+
+    def remove_node(self, node: Node):
+        # Removing a node cannot break the colouring, returns 0 recoloured nodes.
+        if (node not in self.graph):
+            raise ValueError(f"Node {node} is not on the map.")
+        for neighbour in list(self.graph[node]):
+            self.separate(node, neighbour)
+        del self.graph[node]
+        return 0
+
+    def add_path(self, start_node: Node, end_node: Node, **options):
+        # Joins two nodes of the map and recolours one of them if they share a colour,
+        # options go to repair. Returns the number of nodes whose colour changed.
+        self.join(start_node, end_node)
+        if (start_node.color is None or start_node.color != end_node.color):
+            return 0
+        # the node with fewer neighbours is the more likely one to have a colour free
+        if (len(self.graph[start_node]) < len(self.graph[end_node])):
+            return self.repair([start_node, end_node], **options)
+        return self.repair([end_node, start_node], **options)
+
+    def remove_path(self, start_node: Node, end_node: Node):
+        # Removing a path cannot break the colouring, returns 0 recoloured nodes.
+        self.separate(start_node, end_node)
+        return 0
+
+    def path_index(self):
+        # Slots of the paths by their ends, so that removing one does not scan the list.
+        # Rebuilt whenever self.paths was replaced, e.g. by random_graph.
+        if (self.path_slots is None or self.path_slots[0] is not self.paths):
+            self.path_slots = (self.paths, {(path.start_node, path.end_node): slot
+                                            for slot, path in enumerate(self.paths)})
+        return self.path_slots[1]
+
+    def join(self, start_node: Node, end_node: Node):
+        if (start_node not in self.graph or end_node not in self.graph):
+            raise ValueError(f"Path {start_node} - {end_node} joins a node that is not on the map.")
+        if (start_node == end_node or end_node in self.graph[start_node]):
+            raise ValueError(f"Nodes {start_node} and {end_node} cannot be joined again.")
+        slots = self.path_index()
+        slots[(start_node, end_node)] = len(self.paths)
+        self.paths.append(Path(start_node, end_node))
+        self.graph[start_node].append(end_node)
+        self.graph[end_node].append(start_node)
+
+    def separate(self, start_node: Node, end_node: Node):
+        slots = self.path_index()
+        slot = slots.pop((start_node, end_node), None)
+        if (slot is None):
+            slot = slots.pop((end_node, start_node), None)
+        if (slot is None):
+            raise ValueError(f"There is no path {start_node} - {end_node}.")
+        # the last path takes the slot of the removed one
+        last = self.paths.pop()
+        if (slot < len(self.paths)):
+            self.paths[slot] = last
+            slots[(last.start_node, last.end_node)] = slot
+        self.graph[start_node].remove(end_node)
+        self.graph[end_node].remove(start_node)
+
+    def repair(self, nodes: list, chain_limit: int = 50, stats: SolverStats = None,
+               max_assignments: int = None, timeout: int = None, seed: int = None):
+        # Colours the given nodes again when they are uncoloured or clash, with a free colour,
+        # a Kempe chain swap of at most chain_limit nodes or a local search of a growing ball
+        # around the node (see recolor_ball). Returns the number of recoloured nodes, None when
+        # the map cannot be coloured and TIMED_OUT when the budget ran out, the colours restored.
+        stats = self.start_stats(stats)
+        stats.set_budget(max_assignments, timeout)
+        previous = {}
+        for node in nodes:
+            if (node.color is not None and all(neighbour.color != node.color for neighbour in self.graph[node])):
+                continue
+            previous.setdefault(node, node.color)
+            node.color = None
+            used = 0
+            for neighbour in self.graph[node]:
+                if (neighbour.color is not None):
+                    used |= 1 << neighbour.color
+            free = self.all_colors & ~used
+            if (free):
+                node.color = (free & -free).bit_length() - 1
+                continue
+            swapped = kempe_swap(self.graph, NodeColors(), node, self.colors_count, chain_limit)
+            if (swapped is not None):
+                color1, color2, chains = swapped
+                for other in chains:
+                    previous.setdefault(other, other.color)
+                    other.color = color2 if other.color == color1 else color1
+                node.color = color1
+                continue
+            colored = self.recolor_ball(node, previous, seed)
+            if (not colored):
+                for other, color in previous.items():
+                    other.color = color
+                return TIMED_OUT if colored is None else None
+        return sum(1 for node, color in previous.items() if node.color != color)
+
+    def recolor_ball(self, node: Node, previous: dict, seed: int = None):
+        # Colours the nodes within a growing radius of the node again while the nodes
+        # around the ball keep their colours. Min-conflicts starts from the current
+        # colours, so mostly the nodes near the conflict change, and gives up after ten
+        # steps per node of the ball. Once the ball covers the whole component it is
+        # coloured with forward checking instead, which can tell that it is impossible.
+        # Returns True, False when the component cannot be coloured and None when the
+        # budget ran out. Old colours are kept in previous.
+        stats = self.stats
+        ball = {node: None}
+        frontier = [node]
+        radius = 0
+        target = 1
+        while (True):
+            while (radius < target and frontier):
+                next_frontier = []
+                for current in frontier:
+                    for neighbour in self.graph[current]:
+                        if (neighbour not in ball):
+                            ball[neighbour] = None
+                            next_frontier.append(neighbour)
+                frontier = next_frontier
+                radius += 1
+            if (not frontier):
+                return self.recolor_component(list(ball), previous)
+            nodes = list(ball)
+            index = {current: i for i, current in enumerate(nodes)}
+            neighbours = []
+            fixed = []
+            for current in nodes:
+                neighbours.append([index[neighbour] for neighbour in self.graph[current] if neighbour in index])
+                fixed.append([neighbour.color for neighbour in self.graph[current]
+                              if neighbour not in index and neighbour.color is not None])
+            colors = [current.color if current.color is not None else 0 for current in nodes]
+            stats.limit(10 * len(nodes))
+            colors = min_conflicts(neighbours, stats, seed=seed, colors=colors, fixed=fixed,
+                                   colors_count=self.colors_count)
+            stats.limit(None)
+            if (all(colors[i] not in fixed[i] and all(colors[i] != colors[j] for j in neighbours[i])
+                    for i in range(len(nodes)))):
+                for current, color in zip(nodes, colors):
+                    previous.setdefault(current, current.color)
+                    current.color = color
+                return True
+            if (stats.timed_out):
+                return None
+            target *= 2
+
+    def recolor_component(self, component: list, previous: dict):
+        # complete search over a component with nothing around it, see recolor_ball
+        component_map = Map(self.square_size, self.colors_count)
+        component_map.stats = self.stats
+        for current in component:
+            previous.setdefault(current, current.color)
+            current.reset_node(self.all_colors)
+            component_map.graph[current] = self.graph[current]
+        selector = VariableSelector(component_map.graph, 'dsatur', None, self.colors_count)
+        colored = component_map.propagation_search(selector, value_order(range(self.colors_count)),
+                                                   component_map.forward_check)
+        for current in component:
+            current.domain = self.all_colors
+        return colored
 
     def draw(self):
-        window = tk.Tk()
-        window.title("Map coloring")
-        width = height = 600
-        ratio = width / self.square_size
-        width += ratio
-        height += ratio
+        segments = ((path.start_node.x, path.start_node.y, path.end_node.x, path.end_node.y) for path in self.paths)
+        points = ((node.x, node.y) for node in self.graph)
+        show(self.square_size, segments, points, (node.color for node in self.graph))
 
-        colors = ['orange red', 'green yellow', 'deep sky blue', 'plum1']
+    def render(self, path: str, size: int = 600, node_radius: float = 7, line_width: float = 2):
+        self.compact().render(path, size, node_radius, line_width)
 
-        canvas = tk.Canvas(window, bg='#C4C4C4', height=height, width=width)
-        for path in self.paths:
-            canvas.create_line((path.start_node.x + 1) * ratio, (path.start_node.y + 1) * ratio, 
-                               (path.end_node.x + 1) * ratio, (path.end_node.y + 1) * ratio, 
-                               fill='black', width=2)
-        for node in self.graph:
-            color = colors[node.color] if node.color is not None else 'snow'
-            canvas.create_oval((node.x + 1) * ratio + 7, (node.y + 1) * ratio + 7,
-                               (node.x + 1) * ratio - 7, (node.y + 1) * ratio - 7,
-                               fill=color, outline=color)
-            
-        canvas.pack()
-        
-        window.protocol('WM_DELETE_WINDOW', exit)
-        window.mainloop()
-
-
-def test(nodes: int):
-    map = Map(50)
-    iterations_backtrack2 = []
-    time_backtrack2 = []
-    iterations_forward2 = []
-    time_forward2 = []
-    failed_attempts = 0
-
-    while len(iterations_backtrack2) < 10:
-        map.random_graph(nodes)
-        time_backtrack, iterations_backtrack = map.color_backtracking()
+    def compact(self):
+        nodes = list(self.graph)
+        index = {node: i for i, node in enumerate(nodes)}
+        offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum([len(self.graph[node]) for node in nodes], out=offsets[1:])
+        neighbours = np.fromiter((index[neighbour] for node in nodes for neighbour in self.graph[node]),
+                                 dtype=np.int32, count=int(offsets[-1]))
+        x = np.fromiter((node.x for node in nodes), dtype=np.int32, count=len(nodes))
+        y = np.fromiter((node.y for node in nodes), dtype=np.int32, count=len(nodes))
+        colors = np.fromiter((-1 if node.color is None else node.color for node in nodes), dtype=np.int8,
+                             count=len(nodes))
+        return CompactMap(self.square_size, x, y, offsets, neighbours, colors, self.colors_count)
+
+    def save(self, file):
+        self.compact().save(file)
+
+    @staticmethod
+    def load(file):
+        return CompactMap.load(file).expand()
+
+
+class CompactMap:
+    # Array backed map for very large graphs. Coordinates and colours (-1 while not
+    # coloured) are arrays indexed by node and the adjacency is kept in CSR form, the
+    # neighbours of node i are neighbours[offsets[i]:offsets[i + 1]]. Nodes keep the
+    # order of Map.graph. Only color_min_conflicts runs on the arrays. The systematic
+    # searches below build a temporary Map with a Node per node (but no Path objects),
+    # run the method of the same name on it and copy the colours back, which costs the
+    # memory of a Map for as long as they run.
+    __slots__ = ('square_size', 'x', 'y', 'colors', 'offsets', 'neighbours', 'colors_count', 'stats')
+
+    def __init__(self, square_size: int, x: np.ndarray, y: np.ndarray, offsets: np.ndarray,
+                 neighbours: np.ndarray, colors: np.ndarray = None, colors_count: int = ALL_COLORS.bit_length()):
+        self.square_size = square_size
+        self.colors_count = colors_count
+        self.x = x
+        self.y = y
+        self.offsets = offsets
+        self.neighbours = neighbours
+        self.colors = colors if colors is not None else np.full(len(x), -1, dtype=np.int8)
+        self.stats = SolverStats()
+
+    def __len__(self):
+        return len(self.x)
+
+    def solve_expanded(self, method: str, *args, **options):
+        map = self.expand(paths=False)
+        result = getattr(map, method)(*args, **options)
+        self.colors[:] = [-1 if node.color is None else node.color for node in map.graph]
+        self.stats = map.stats
+        return result
+
+    def color_backtracking(self, variable_order: str = 'input', stats: SolverStats = None, **budget):
+        return self.solve_expanded('color_backtracking', variable_order, stats, **budget)
+
+    def color_backjumping(self, variable_order: str = 'input', nogood_limit: int = 0, stats: SolverStats = None,
+                          **budget):
+        return self.solve_expanded('color_backjumping', variable_order, nogood_limit, stats, **budget)
+
+    def color_backtracking_with_forward_checking(self, variable_order: str = 'input', stats: SolverStats = None,
+                                                 **budget):
+        return self.solve_expanded('color_backtracking_with_forward_checking', variable_order, stats, **budget)
+
+    def color_maintaining_arc_consistency(self, variable_order: str = 'input', stats: SolverStats = None, **budget):
+        return self.solve_expanded('color_maintaining_arc_consistency', variable_order, stats, **budget)
+
+    def color_kernelized(self, method: str = 'color_backtracking_with_forward_checking', k: int = None,
+                         biconnected: bool = True, processes: int = 1, **options):
+        return self.solve_expanded('color_kernelized', method, k, biconnected, processes, **options)
+
+    def degrees(self):
+        return np.diff(self.offsets)
+
+    def edges(self):
+        # both ends of every edge once, as two arrays
+        sources = np.repeat(np.arange(len(self.x), dtype=self.neighbours.dtype), self.degrees())
+        once = sources < self.neighbours
+        return sources[once], self.neighbours[once]
+
+    def adjacency(self):
+        flat = self.neighbours.tolist()
+        bounds = self.offsets.tolist()
+        return [flat[bounds[i]:bounds[i + 1]] for i in range(len(self.x))]
+
+    def conflicts(self):
+        # edges whose ends share a colour, uncoloured nodes do not count
+        sources, targets = self.edges()
+        colors = self.colors
+        return int(np.count_nonzero((colors[sources] == colors[targets]) & (colors[sources] >= 0)))
+
+    def reset_map_state(self):
+        self.colors[:] = -1
+
+    def expand(self, paths: bool = True):
+        # without paths only the graph is built, which is all the solvers need
+        map = Map(self.square_size, self.colors_count)
+        nodes = [Node(x, y) for x, y in zip(self.x.tolist(), self.y.tolist())]
+        for node, color in zip(nodes, self.colors.tolist()):
+            node.color = color if color >= 0 else None
+        for node, neighbours in zip(nodes, self.adjacency()):
+            map.graph[node] = [nodes[i] for i in neighbours]
+        if (paths):
+            map.paths = [Path(nodes[i], nodes[j]) for i, j in zip(*(ends.tolist() for ends in self.edges()))]
+        return map
+
+    def color_min_conflicts(self, variable_order: str = 'dsatur', stats: SolverStats = None,
+                            max_assignments: int = None, timeout: int = None, seed: int = None,
+                            tabu_tenure: int = 0, sample_size: int = 64):
+        self.stats = stats if stats is not None else SolverStats()
+        self.stats.set_budget(max_assignments, timeout)
+        start = time_ns() // 1000000
+        self.colors[:] = min_conflicts(self.adjacency(), self.stats, variable_order, seed, tabu_tenure, sample_size,
+                                       colors_count=self.colors_count)
+        if (self.stats.timed_out):
+            return TIMED_OUT, self.stats.assignments
+        return (time_ns() // 1000000 - start), self.stats.assignments
+
+    def save(self, file):
+        # Uncompressed .npz, so the arrays can be memory-mapped by load. file is a path
+        # or an open binary file.
+        np.savez(file, square_size=np.array(self.square_size), x=self.x, y=self.y, offsets=self.offsets,
+                 neighbours=self.neighbours, colors=self.colors, colors_count=np.array(self.colors_count))
+
+    @staticmethod
+    def load(file, mmap: bool = False):
+        # With mmap the coordinates and the adjacency stay on disk and are paged in on
+        # access, the colours are always copied as solvers write them.
+        arrays = load_arrays(file, mmap)
+        # files saved before colours_count was stored hold four colour maps
+        colors_count = int(arrays['colors_count']) if 'colors_count' in arrays else ALL_COLORS.bit_length()
+        return CompactMap(int(arrays['square_size']), arrays['x'], arrays['y'], arrays['offsets'],
+                          arrays['neighbours'], np.array(arrays['colors']), colors_count)
+
+    def draw(self):
+        sources, targets = self.edges()
+        segments = zip(self.x[sources].tolist(), self.y[sources].tolist(),
+                       self.x[targets].tolist(), self.y[targets].tolist())
+        colors = (color if color >= 0 else None for color in self.colors.tolist())
+        show(self.square_size, segments, zip(self.x.tolist(), self.y.tolist()), colors)
+
+    def render(self, path: str, size: int = 600, node_radius: float = 7, line_width: float = 2):
+        # writes an .svg or .png picture without a display, see render
+        sources, targets = self.edges()
+        segments = np.column_stack((self.x[sources], self.y[sources], self.x[targets], self.y[targets]))
+        render(path, self.square_size, segments, np.column_stack((self.x, self.y)), self.colors, size,
+               node_radius, line_width)
+
+
+def load_arrays(path: str, mmap: bool = False):
+    # Arrays of an .npz file by name. With mmap every member has to be stored without
+    # compression and is mapped in place, after its zip and .npy headers.
+    if (not mmap):
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as file:
+        for info in archive.infolist():
+            if (info.compress_type != zipfile.ZIP_STORED):
+                raise ValueError(f"'{info.filename}' in '{path}' is compressed and cannot be memory-mapped.")
+            file.seek(info.header_offset)
+            name_length, extra_length = struct.unpack('<HH', file.read(30)[26:30])
+            file.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(file)
+            if (version == (1, 0)):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+            name = info.filename[:-len('.npy')] if info.filename.endswith('.npy') else info.filename
+            if (not shape or 0 in shape):
+                # empty and 0-d arrays cannot be mapped
+                arrays[name] = np.fromfile(file, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', shape=shape, offset=file.tell(),
+                                         order='F' if fortran_order else 'C')
+    return arrays
+
+def cached_map(square_size: int, nodes_count: int, key: str, cache: str = None, mode: str = 'nearest',
+               average_degree: float = None):
+    # Seeds the random state with key and generates the map, unless the cache directory
+    # already holds a map generated with the same parameters. New maps are written under
+    # a temporary name first, so processes sharing the cache never read half a file.
+    if (cache is not None):
+        thinned = f'-{average_degree}' if average_degree is not None else ''
+        path = os.path.join(cache, f'map-{mode}{thinned}-{square_size}-{nodes_count}-{key}.npz')
+        if (os.path.exists(path)):
+            return Map.load(path)
+    random.seed(key)
+    map = Map(square_size)
+    map.random_graph(nodes_count, mode, average_degree)
+    if (cache is not None):
+        os.makedirs(cache, exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as file:
+            map.save(file)
+        os.replace(temporary, path)
+    return map
+
+def show(square_size: int, segments, points, colors):
+    # segments are (x1, y1, x2, y2) tuples, colors hold a colour index or None per point
+    import tkinter as tk
+    window = tk.Tk()
+    window.title("Map coloring")
+    width = height = 600
+    ratio = width / square_size
+    width += ratio
+    height += ratio
+
+    canvas = tk.Canvas(window, bg=BACKGROUND, height=height, width=width)
+    for x1, y1, x2, y2 in segments:
+        canvas.create_line((x1 + 1) * ratio, (y1 + 1) * ratio,
+                           (x2 + 1) * ratio, (y2 + 1) * ratio,
+                           fill='black', width=2)
+    for (x, y), color in zip(points, colors):
+        color = PALETTE[color % len(PALETTE)] if color is not None else UNCOLORED
+        canvas.create_oval((x + 1) * ratio + 7, (y + 1) * ratio + 7,
+                           (x + 1) * ratio - 7, (y + 1) * ratio - 7,
+                           fill=color, outline=color)
+
+    canvas.pack()
+
+    window.protocol('WM_DELETE_WINDOW', exit)
+    window.mainloop()
+
+def render(path: str, square_size: int, segments: np.ndarray, points: np.ndarray, colors: np.ndarray,
+           size: int = 600, node_radius: float = 7, line_width: float = 2):
+    # Headless counterpart of show, writes the picture to an .svg or .png file. segments
+    # is an (n, 4) array of x1, y1, x2, y2 rows, points an (n, 2) array and colors holds
+    # a colour index or -1 per point. All edges go into one SVG path and the nodes into
+    # one path per colour, the PNG is rasterized with numpy, so the work does not grow
+    # with one drawing call per element.
+    extension = os.path.splitext(path)[1].lower()
+    if (extension not in ('.svg', '.png')):
+        raise ValueError(f'Unknown image format: {extension}')
+    ratio = size / square_size
+    width = height = size + ratio
+    segments = (np.asarray(segments, dtype=np.float64).reshape(-1, 4) + 1) * ratio
+    points = (np.asarray(points, dtype=np.float64).reshape(-1, 2) + 1) * ratio
+    colors = np.asarray(colors, dtype=np.int64)
+    # -1 for uncoloured nodes, the palette index otherwise
+    shades = np.where(colors >= 0, colors % len(PALETTE), -1)
+    fills = [(shade, PALETTE[shade] if shade >= 0 else UNCOLORED) for shade in range(-1, len(PALETTE))]
+    if (extension == '.svg'):
+        with open(path, 'w') as file:
+            file.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:g}" height="{height:g}">\n'
+                       f'<rect width="100%" height="100%" fill="{BACKGROUND}"/>\n')
+            if (len(segments)):
+                lines = ('M%.2f %.2fL%.2f %.2f' * len(segments)) % tuple(segments.ravel().tolist())
+                file.write(f'<path fill="none" stroke="black" stroke-width="{line_width:g}" d="{lines}"/>\n')
+            for shade, fill in fills:
+                centres = points[shades == shade]
+                if (not len(centres)):
+                    continue
+                # a circle is two half circle arcs from its leftmost point
+                circle = f'M%.2f %.2fa{node_radius:g} {node_radius:g} 0 1 0 {2 * node_radius:g} 0' \
+                         f'a{node_radius:g} {node_radius:g} 0 1 0 {-2 * node_radius:g} 0'
+                centres[:, 0] -= node_radius
+                file.write(f'<path fill="{fill}" d="{(circle * len(centres)) % tuple(centres.ravel().tolist())}"/>\n')
+            file.write('</svg>\n')
+        return
+    image = np.empty((ceil(height), ceil(width), 3), dtype=np.uint8)
+    image[:] = hex_to_rgb(BACKGROUND)
+    if (len(segments)):
+        # every segment sampled at least once per pixel along its longer axis
+        x1, y1, x2, y2 = segments.T
+        samples = np.ceil(np.maximum(np.abs(x2 - x1), np.abs(y2 - y1))).astype(np.int64) + 1
+        steps = np.arange(samples.sum()) - np.repeat(np.cumsum(samples) - samples, samples)
+        t = steps / np.repeat(np.maximum(samples - 1, 1), samples)
+        xs = np.repeat(x1, samples) + t * np.repeat(x2 - x1, samples)
+        ys = np.repeat(y1, samples) + t * np.repeat(y2 - y1, samples)
+        low = -(int(round(line_width)) // 2)
+        square = np.arange(low, low + max(int(round(line_width)), 1))
+        stamp(image, xs, ys, np.repeat(square, len(square)), np.tile(square, len(square)), (0, 0, 0))
+    reach = int(ceil(node_radius))
+    dx, dy = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+    inside = dx * dx + dy * dy <= node_radius * node_radius
+    for shade, fill in fills:
+        centres = points[shades == shade]
+        if (len(centres)):
+            stamp(image, centres[:, 0], centres[:, 1], dx[inside], dy[inside], hex_to_rgb(fill))
+    with open(path, 'wb') as file:
+        file.write(encode_png(image))
+
+def hex_to_rgb(color: str):
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+def stamp(image: np.ndarray, xs: np.ndarray, ys: np.ndarray, dx: np.ndarray, dy: np.ndarray, rgb: tuple):
+    # Paints the pixel offsets dx, dy around every point, in chunks that keep the
+    # index arrays to about a million entries.
+    height, width = image.shape[:2]
+    xs = np.rint(xs).astype(np.int64)
+    ys = np.rint(ys).astype(np.int64)
+    chunk = max(1, (1 << 20) // len(dx))
+    for start in range(0, len(xs), chunk):
+        px = (xs[start:start + chunk, None] + dx).ravel()
+        py = (ys[start:start + chunk, None] + dy).ravel()
+        visible = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+        image[py[visible], px[visible]] = rgb
+
+def encode_png(image: np.ndarray):
+    # 8 bit RGB PNG, every row with filter type 0
+    height, width = image.shape[:2]
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(kind: bytes, data: bytes):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)) + chunk(b'IEND', b''))
+
+
+def remove_conflicting(conflicting: list, slots: dict, i: int):
+    slot = slots.pop(i, None)
+    if (slot is None):
+        return
+    last = conflicting.pop()
+    if (last != i):
+        conflicting[slot] = last
+        slots[last] = slot
+
+class NodeColors:
+    # colors[node] view of the colours of Map nodes, so the helpers below that take
+    # adjacency lists and colours by index also run on Map.graph directly
+    def __getitem__(self, node: Node):
+        return node.color
+
+def kempe_swap(neighbours: list, colors: list, i: int, colors_count: int, chain_limit: int, fixed: list = None):
+    # Looks for colours (color1, color2) such that swapping them in the Kempe chains of
+    # the neighbours of node i with color1 frees color1 for it, which happens unless a
+    # neighbour with color2 is in one of the chains. Node i itself is left out of the
+    # chains. With fixed (see min_conflicts) a chain that would give one of its nodes
+    # the colour of a fixed neighbour does not count. Returns both colours and the nodes
+    # of the smallest such chains without changing colors, None when no swap within
+    # chain_limit nodes works.
+    best = None
+    for color1 in range(colors_count):
+        if (fixed is not None and color1 in fixed[i]):
+            continue
+        for color2 in range(colors_count):
+            if (color1 == color2):
+                continue
+            limit = chain_limit if best is None else len(best[2]) - 1
+            chains = set()
+            for j in neighbours[i]:
+                if (colors[j] == color1 and j not in chains):
+                    chain = kempe_chain(neighbours, colors, j, color1, color2, limit - len(chains), i, fixed)
+                    if (chain is None):
+                        break
+                    chains |= chain
+            else:
+                if (not any(colors[j] == color2 and j in chains for j in neighbours[i])):
+                    best = (color1, color2, chains)
+    return best
+
+def kempe_chain(neighbours: list, colors: list, start: int, color1: int, color2: int, limit: int,
+                excluded: int = None, fixed: list = None):
+    # nodes reachable from start through nodes of the two colours other than excluded,
+    # None when there are more than limit of them
+    chain = [start]
+    seen = {start, excluded}
+    for x in chain:
+        other = color2 if colors[x] == color1 else color1
+        if (fixed is not None and other in fixed[x]):
+            return None
+        for y in neighbours[x]:
+            if (colors[y] == other and y not in seen):
+                seen.add(y)
+                chain.append(y)
+        if (len(chain) > limit):
+            return None
+    seen.discard(excluded)
+    return seen
+
+def greedy_coloring(neighbours: list, variable_order: str = 'input', chain_limit: int = 1000,
+                    colors_count: int = ALL_COLORS.bit_length()):
+    # Gives every node the lowest colour its coloured neighbours do not use. When they
+    # use all of them a Kempe chain swap frees one if possible, otherwise the least
+    # used colour is taken. Static orders colour the nodes in order, mrv and dsatur
+    # pick the most saturated node from a lazily updated heap.
+    if (variable_order not in VARIABLE_ORDERS):
+        raise ValueError(f"Unknown variable order '{variable_order}', expected one of {VARIABLE_ORDERS}.")
+    colors = [None] * len(neighbours)
+
+    def pick(i: int):
+        used = [0] * colors_count
+        for j in neighbours[i]:
+            if (colors[j] is not None):
+                used[colors[j]] += 1
+        if (min(used)):
+            swapped = kempe_swap(neighbours, colors, i, colors_count, chain_limit)
+            if (swapped is not None):
+                color1, color2, chains = swapped
+                for x in chains:
+                    colors[x] = color2 if colors[x] == color1 else color1
+                return color1
+        return used.index(min(used))
+
+    if (variable_order in ('input', 'degree')):
+        order = range(len(neighbours))
+        if (variable_order == 'degree'):
+            order = sorted(order, key=lambda i: -len(neighbours[i]))
+        for i in order:
+            colors[i] = pick(i)
+        return colors
+    saturation = [0] * len(neighbours)
+    heap = [(0, -len(adjacent), i) for i, adjacent in enumerate(neighbours)]
+    heapify(heap)
+    while (heap):
+        negative_saturation, _, i = heappop(heap)
+        # entries are pushed again when the saturation grows, older ones are skipped
+        if (colors[i] is not None or -negative_saturation != bin(saturation[i]).count('1')):
+            continue
+        color = colors[i] = pick(i)
+        for j in neighbours[i]:
+            if (colors[j] is None and not saturation[j] >> color & 1):
+                saturation[j] |= 1 << color
+                heappush(heap, (-bin(saturation[j]).count('1'), -len(neighbours[j]), j))
+    return colors
+
+def min_conflicts(neighbours: list, stats: SolverStats, variable_order: str = 'dsatur', seed: int = None,
+                  tabu_tenure: int = 0, sample_size: int = 64, colors: list = None, fixed: list = None,
+                  colors_count: int = ALL_COLORS.bit_length(), chain_limit: int = 100):
+    # Min-conflicts local search with a tabu list. Starts from a greedy colouring and
+    # makes the best recolouring among (a sample of) the conflicting nodes. A node
+    # may not take back its previous colour for a while, tabu_tenure plus a part
+    # proportional to the conflicts, unless that beats the best colouring so far.
+    # When no recolouring reduces the conflicts, a Kempe chain swap of at most
+    # chain_limit nodes may still free a colour for one of the sampled nodes, which
+    # clears its conflicts without adding any. This resolves the few conflicts
+    # single moves keep circling around on large planar maps.
+    # Every node keeps the number of neighbours of each colour, so a step costs
+    # O(degree + sample_size). Local search cannot prove that no colouring exists,
+    # without a budget it runs until it finds one. Takes the adjacency lists of the
+    # nodes and returns their colours, stats count the recolouring steps. colors
+    # replaces the greedy start and fixed[i] lists the colours of neighbours of node i
+    # that are not part of the search and never change.
+    choice = Random(seed)
+    if (colors is None):
+        colors = greedy_coloring(neighbours, variable_order, colors_count=colors_count)
+    else:
+        colors = list(colors)
+    # counts[i * colors_count + c] is the number of neighbours of node i with colour c
+    counts = [0] * (len(neighbours) * colors_count)
+    for i, adjacent in enumerate(neighbours):
+        for j in adjacent:
+            counts[i * colors_count + colors[j]] += 1
+        if (fixed is not None):
+            for color in fixed[i]:
+                counts[i * colors_count + color] += 1
+    # conflicting nodes with their slots in the list, for constant time picks and removals
+    conflicting = [i for i in range(len(neighbours)) if counts[i * colors_count + colors[i]]]
+    slots = {i: slot for slot, i in enumerate(conflicting)}
+    # tabu[i * colors_count + c] is the step until which node i may not take colour c
+    tabu = [0] * (len(neighbours) * colors_count)
+    total_conflicts = sum(counts[i * colors_count + colors[i]] for i in conflicting)
+    if (fixed is not None):
+        # conflicts with fixed neighbours are only counted from one side
+        total_conflicts += sum(fixed[i].count(colors[i]) for i in conflicting)
+    total_conflicts //= 2
+    best_conflicts = total_conflicts
+
+    def recolor(i: int, new_color: int):
+        nonlocal total_conflicts
+        base = i * colors_count
+        old_color = colors[i]
+        total_conflicts += counts[base + new_color] - counts[base + old_color]
+        colors[i] = new_color
+        for j in neighbours[i]:
+            offset = j * colors_count
+            counts[offset + old_color] -= 1
+            counts[offset + new_color] += 1
+            if (colors[j] == old_color and not counts[offset + old_color]):
+                remove_conflicting(conflicting, slots, j)
+            elif (colors[j] == new_color and j not in slots):
+                slots[j] = len(conflicting)
+                conflicting.append(j)
+        if (not counts[base + new_color]):
+            remove_conflicting(conflicting, slots, i)
+        elif (i not in slots):
+            slots[i] = len(conflicting)
+            conflicting.append(i)
+
+    while (conflicting):
+        stats.assignments += 1
+        step = stats.assignments
+        if (step == stats.next_report and stats.report()):
+            break
+        # the best move of a sample of conflicting nodes, a tabu move is only taken
+        # when it leads to fewer conflicts than ever before
+        if (len(conflicting) > sample_size):
+            sample = [conflicting[choice.randrange(len(conflicting))] for _ in range(sample_size)]
+        else:
+            sample = conflicting
+        best = []
+        best_delta = None
+        for i in sample:
+            base = i * colors_count
+            current = counts[base + colors[i]]
+            for color in range(colors_count):
+                if (color == colors[i]):
+                    continue
+                delta = counts[base + color] - current
+                if (tabu[base + color] > step and total_conflicts + delta >= best_conflicts):
+                    continue
+                if (best_delta is None or delta < best_delta):
+                    best = [(i, color)]
+                    best_delta = delta
+                elif (delta == best_delta):
+                    best.append((i, color))
+        if (best_delta is None or best_delta >= 0):
+            i = sample[choice.randrange(len(sample))]
+            swapped = kempe_swap(neighbours, colors, i, colors_count, chain_limit, fixed)
+            if (swapped is not None):
+                color1, color2, chains = swapped
+                for x in chains:
+                    recolor(x, color2 if colors[x] == color1 else color1)
+                recolor(i, color1)
+                best_conflicts = min(best_conflicts, total_conflicts)
+                continue
+        if (not best):
+            i = sample[choice.randrange(len(sample))]
+            best = [(i, color) for color in range(colors_count) if color != colors[i]]
+        i, new_color = best[choice.randrange(len(best))] if len(best) > 1 else best[0]
+        tabu[i * colors_count + colors[i]] = step + tabu_tenure + int(0.6 * len(conflicting)) + choice.randrange(10)
+        recolor(i, new_color)
+        best_conflicts = min(best_conflicts, total_conflicts)
+    return colors
+
+def connected_components(graph: dict):
+    components = []
+    seen = set()
+    for root in graph:
+        if (root in seen):
+            continue
+        seen.add(root)
+        component = [root]
+        for node in component:
+            for neighbour in graph[node]:
+                if (neighbour not in seen):
+                    seen.add(neighbour)
+                    component.append(neighbour)
+        components.append(component)
+    return components
+
+def biconnected_components(graph: dict):
+    # Iterative Tarjan's algorithm. Returns the node lists of the blocks in the order
+    # the depth first search finishes them, a block after every block below it.
+    index = {}
+    low = {}
+    components = []
+    for root in graph:
+        if (root in index):
+            continue
+        index[root] = low[root] = len(index)
+        stack = [(root, None, iter(graph[root]))]
+        edges = []
+        while (stack):
+            node, parent, neighbours = stack[-1]
+            for neighbour in neighbours:
+                if (neighbour not in index):
+                    index[neighbour] = low[neighbour] = len(index)
+                    edges.append((node, neighbour))
+                    stack.append((neighbour, node, iter(graph[neighbour])))
+                    break
+                if (neighbour is not parent and index[neighbour] < index[node]):
+                    low[node] = min(low[node], index[neighbour])
+                    edges.append((node, neighbour))
+            else:
+                stack.pop()
+                if (parent is None):
+                    continue
+                low[parent] = min(low[parent], low[node])
+                if (low[node] >= index[parent]):
+                    component = {}
+                    while (True):
+                        edge = edges.pop()
+                        component[edge[0]] = component[edge[1]] = None
+                        if (edge == (parent, node)):
+                            break
+                    components.append(list(component))
+    return components
+
+def solve_component(job: tuple):
+    # Colours a part of a map given by coordinates and adjacency lists, so it can be
+    # sent to another process. Returns the result, the colours and the counters.
+    method, square_size, colors_count, coordinates, adjacency, options = job
+    map = Map(square_size, colors_count)
+    nodes = [Node(x, y) for x, y in coordinates]
+    for node, neighbours in zip(nodes, adjacency):
+        map.graph[node] = [nodes[i] for i in neighbours]
+    time, iterations = getattr(map, method)(**options)
+    colors = {original: node.color for original, node in zip(coordinates, nodes)}
+    counters = {'assignments': map.stats.assignments, 'backtracks': map.stats.backtracks,
+                'prunings': map.stats.prunings, 'restarts': map.stats.restarts}
+    return time, iterations, colors, counters
+
+
+ALGORITHMS = {
+    'backtracking': Map.color_backtracking,
+    'forward_checking': Map.color_backtracking_with_forward_checking,
+    'arc_consistency': Map.color_maintaining_arc_consistency,
+    'backjumping': Map.color_backjumping,
+    'min_conflicts': Map.color_min_conflicts,
+}
+
+# budget options only the systematic searches take, they are not passed to the local search
+SYSTEMATIC_OPTIONS = ('restarts', 'restart_base', 'break_symmetry')
+
+# With fewer than four colours a map may have no colouring, which the local search
+# cannot tell, so without a budget of its own it stops after this many steps per node.
+LOCAL_STEPS_PER_NODE = 100
+
+
+def run_trial(trial: tuple):
+    # Generates one map and colours it with every algorithm. The random state is seeded
+    # from the trial itself, so results do not depend on how trials are spread over
+    # the processes.
+    nodes, trial_index, seed, algorithms, square_size, variable_order, budget, cache, generator, colors_count = trial
+    key = f'{seed}-{nodes}-{trial_index}'
+    start = time_ns() // 1000000
+    map = cached_map(square_size, nodes, key, cache, *generator)
+    map.colors_count = colors_count
+    generation_time = time_ns() // 1000000 - start
+    # drawn apart from the generator, so it is the same for cached maps
+    restart_seed = Random(f'{key}-restarts').getrandbits(32)
+    records = []
+    for algorithm in algorithms:
         map.reset_map_state()
-        time_forward, iterations_forward = map.color_backtracking_with_forward_checking()
-        if (time_forward is None):
-            failed_attempts += 1
+        options = budget
+        if (algorithm == 'min_conflicts'):
+            options = {key: value for key, value in budget.items() if key not in SYSTEMATIC_OPTIONS}
+            if (colors_count < 4 and 'max_assignments' not in options and 'timeout' not in options):
+                options['max_assignments'] = LOCAL_STEPS_PER_NODE * nodes
+        time, assignments = ALGORITHMS[algorithm](map, variable_order, seed=restart_seed, **options)
+        timed_out = time == TIMED_OUT
+        if (timed_out):
+            time = None
+        records.append({
+            'nodes': nodes,
+            'trial': trial_index,
+            'seed': seed,
+            'algorithm': algorithm,
+            'variable_order': variable_order,
+            'colors_count': colors_count,
+            'square_size': square_size,
+            'mode': generator[0],
+            'average_degree': generator[1],
+            'generation_time': generation_time,
+            'time': time,
+            'assignments': assignments,
+            'backtracks': map.stats.backtracks,
+            'prunings': map.stats.prunings,
+            'restarts': map.stats.restarts,
+            'timed_out': timed_out,
+            'success': time is not None,
+        })
+    return records
+
+
+def run_benchmark(nodes_counts: list, trials: int = 10, seed: int = 0, algorithms: tuple = tuple(ALGORITHMS),
+                  square_size: int = 50, variable_order: str = 'input', processes: int = None, output: str = None,
+                  max_assignments: int = None, timeout: int = None, restarts: str = None, cache: str = None,
+                  mode: str = 'nearest', average_degree: float = None, colors_count: int = ALL_COLORS.bit_length(),
+                  break_symmetry: bool = False):
+    # With a cache directory the generated maps are saved there and reused by later runs,
+    # mode and average_degree are passed to Map.random_graph. break_symmetry only applies
+    # to the systematic searches.
+    for algorithm in algorithms:
+        if (algorithm not in ALGORITHMS):
+            raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {tuple(ALGORITHMS)}.")
+    # only the limits that were given are passed on, run_trial drops the restarts and
+    # break_symmetry for the local search and caps it with fewer than four colours
+    budget = {key: value for key, value in (('max_assignments', max_assignments), ('timeout', timeout),
+                                             ('restarts', restarts)) if value is not None}
+    if (break_symmetry):
+        budget['break_symmetry'] = True
+    generator = (mode, average_degree)
+    jobs = [(nodes, trial, seed, tuple(algorithms), square_size, variable_order, budget, cache, generator,
+             colors_count) for nodes in nodes_counts for trial in range(trials)]
+    with Pool(processes) as pool:
+        records = [record for records in pool.imap(run_trial, jobs) for record in records]
+    if (output is not None):
+        save_records(records, output)
+    return records
+
+
+def save_records(records: list, path: str):
+    if (path.endswith('.csv')):
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(records[0]))
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(path, 'w') as file:
+            json.dump(records, file, indent=1)
+
+
+def load_records(path: str):
+    if (not path.endswith('.csv')):
+        with open(path) as file:
+            return json.load(file)
+    records = []
+    with open(path, newline='') as file:
+        for row in csv.DictReader(file):
+            for key in ('nodes', 'trial', 'seed', 'colors_count', 'square_size', 'generation_time', 'time',
+                        'assignments', 'backtracks', 'prunings', 'restarts'):
+                if (key in row):
+                    row[key] = int(row[key]) if row[key] not in ('', 'None') else None
+            if ('average_degree' in row):
+                row['average_degree'] = float(row['average_degree']) if row['average_degree'] not in ('', 'None') else None
+            row['success'] = row['success'] == 'True'
+            row['timed_out'] = row.get('timed_out') == 'True'
+            records.append(row)
+    return records
+
+
+def summarize(records: list):
+    groups = {}
+    for record in records:
+        groups.setdefault((record['nodes'], record['algorithm']), []).append(record)
+    for (nodes, algorithm), group in groups.items():
+        solved = [record for record in group if record['success']]
+        timed_out = sum(1 for record in group if record.get('timed_out'))
+        print(f"{nodes} nodes, {algorithm}: {len(solved)}/{len(group)} coloured, {timed_out} timed out")
+        if (not solved):
             continue
-        iterations_backtrack2.append(iterations_backtrack)
-        iterations_forward2.append(iterations_forward)
-        time_backtrack2.append(time_backtrack)
-        time_forward2.append(time_forward)
-
-    print(f"{nodes} nodes test")
-    print("Min time and iterations backtrack: ", min(time_backtrack2), min(iterations_backtrack2))
-    print("Max time and iterations backtrack: ", max(time_backtrack2), max(iterations_backtrack2))
-    print("Average time and iterations backtrack: ", mean(time_backtrack2), mean(iterations_backtrack2))
-    print("Standard deviation time and iterations backtrack: ", stdev(time_backtrack2), stdev(iterations_backtrack2))
-    print()
-    print("Min time and iterations forward: ", min(time_forward2), min(iterations_forward2))
-    print("Max time and iterations forward: ", max(time_forward2), max(iterations_forward2))
-    print("Average time and iterations forward: ", mean(time_forward2), mean(iterations_forward2))
-    print("Standard deviation time and iterations forward: ", stdev(time_forward2), stdev(iterations_forward2))
-    print(f"Percent of success: {(10 / (failed_attempts + 10)) * 100}%")
+        times = [record['time'] for record in solved]
+        assignments = [record['assignments'] for record in solved]
+        print("Min time and iterations: ", min(times), min(assignments))
+        print("Max time and iterations: ", max(times), max(assignments))
+        print("Average time and iterations: ", mean(times), mean(assignments))
+        if (len(solved) > 1):
+            print("Standard deviation time and iterations: ", stdev(times), stdev(assignments))
+        print()
 
-    map.draw()
 
-                    
-# test(25)
-map = Map(50)
-map.random_graph(25)
-map.color_backtracking_with_forward_checking()
-map.draw()
+def record_key(record: dict):
+    # Records of the same trial on the same kind of map, the generator fields and the
+    # colour count are missing in records saved before they were stored and take their
+    # defaults then.
+    return (record['nodes'], record['trial'], record['seed'], record['algorithm'], record['variable_order'],
+            record.get('square_size', 50), record.get('mode', 'nearest'), record.get('average_degree'),
+            record.get('colors_count', ALL_COLORS.bit_length()))
+
+
+def compare_to_baseline(records: list, baseline_path: str, tolerance: float = 0.2):
+    # Maps are reproducible, so any change of assignments or of the result on the same
+    # trial is reported, and the mean time of a group may grow by at most tolerance.
+    baseline = {record_key(record): record for record in load_records(baseline_path)}
+    regressions = []
+    times = {}
+    for record in records:
+        key = record_key(record)
+        if (key not in baseline):
+            continue
+        previous = baseline[key]
+        if (record['success'] != previous['success'] or record['assignments'] != previous['assignments']):
+            regressions.append(f"{record['algorithm']}, {record['nodes']} nodes, trial {record['trial']}: "
+                               f"{previous['assignments']} -> {record['assignments']} assignments")
+        if (record['success'] and previous['success']):
+            group = times.setdefault((record['nodes'], record['algorithm']), ([], []))
+            group[0].append(previous['time'])
+            group[1].append(record['time'])
+    for (nodes, algorithm), (previous_times, current_times) in times.items():
+        if (mean(current_times) > mean(previous_times) * (1 + tolerance) + 1):
+            regressions.append(f"{algorithm}, {nodes} nodes: average time {mean(previous_times)}ms -> "
+                               f"{mean(current_times)}ms")
+    for regression in regressions:
+        print(regression)
+    return regressions
+
+
+def test(nodes: int, trials: int = 10, seed: int = 0, cache: str = None):
+    summarize(run_benchmark([nodes], trials, seed, cache=cache))
+
+
+if (__name__ == '__main__'):
+    # test(25)
+    # run_benchmark([10, 20, 25], trials=10, seed=0, output='benchmark.json')
+    map = Map(50)
+    map.random_graph(25)
+    map.color_backtracking_with_forward_checking()
+    map.draw()
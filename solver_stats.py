@@ -0,0 +1,80 @@
+from time import perf_counter_ns
+
+
+class SolverStats:
+    # Counters of a single search, shared by the map colouring and zebra puzzle solvers.
+    # Solvers bump the attributes directly and call report() only when assignments reach
+    # next_report, so without an observer or a budget the bookkeeping is one comparison
+    # per assignment and no clock reads. Propagation time is only measured when
+    # time_propagation is set.
+    def __init__(self, observer: callable = None, every: int = 10000, time_propagation: bool = False,
+                 check_every: int = 256):
+        self.assignments = 0
+        self.backtracks = 0
+        self.prunings = 0
+        self.propagation_time = 0
+        self.restarts = 0
+        self.time_propagation = time_propagation
+        self.observer = observer
+        self.every = every
+        # the deadline is only compared with the clock every check_every assignments
+        self.check_every = check_every
+        self.next_observation = every if observer is not None else None
+        self.max_assignments = None
+        self.deadline = None
+        self.next_check = None
+        self.cutoff = None
+        self.timed_out = False
+        self.start = perf_counter_ns()
+        self.schedule()
+
+    def set_budget(self, max_assignments: int = None, timeout: int = None):
+        # timeout is in milliseconds from now, both limits cover all restarts
+        self.max_assignments = max_assignments
+        if (timeout is not None):
+            self.deadline = perf_counter_ns() + timeout * 1000000
+            self.next_check = self.assignments + self.check_every
+        self.schedule()
+
+    def limit(self, cutoff: int = None):
+        # ends the current run after cutoff more assignments, used for restarts
+        self.cutoff = self.assignments + cutoff if cutoff is not None else None
+        self.schedule()
+
+    def schedule(self):
+        # assignments never go negative, so -1 is never reached
+        points = [point for point in (self.next_observation, self.max_assignments, self.next_check, self.cutoff)
+                  if point is not None and point > self.assignments]
+        self.next_report = min(points) if points else -1
+
+    def report(self):
+        # Returns True when the current run has to stop, timed_out tells whether the
+        # whole budget is spent or only the restart cutoff was reached.
+        if (self.next_observation is not None and self.assignments >= self.next_observation):
+            self.next_observation += self.every
+            self.observer(self)
+        if (self.max_assignments is not None and self.assignments >= self.max_assignments):
+            self.timed_out = True
+        if (self.next_check is not None and self.assignments >= self.next_check):
+            self.next_check += self.check_every
+            if (perf_counter_ns() >= self.deadline):
+                self.timed_out = True
+        self.schedule()
+        return self.timed_out or (self.cutoff is not None and self.assignments >= self.cutoff)
+
+    def elapsed(self):
+        return (perf_counter_ns() - self.start) // 1000000
+
+    def as_dict(self):
+        return {
+            'assignments': self.assignments,
+            'backtracks': self.backtracks,
+            'prunings': self.prunings,
+            'propagation_time': self.propagation_time // 1000000,
+            'restarts': self.restarts,
+            'timed_out': self.timed_out
+        }
+
+
+def print_progress(stats: SolverStats):
+    print(f'{stats.elapsed()}ms', f'{stats.assignments} iterations')
@@ -0,0 +1,245 @@
+import numpy as np
+import pytest
+import random
+from random import Random
+from map_colouring import CompactMap, Map, Node, Path, delaunay_edges, load_arrays, orient
+
+
+def random_segment(random: Random, size: int):
+    # small squares give plenty of vertical, collinear and touching segments
+    kind = random.random()
+    x1, y1 = random.randrange(size), random.randrange(size)
+    if (kind < 0.2):
+        return x1, y1, x1, random.randrange(size)
+    if (kind < 0.4):
+        # on the line through (x1, y1) with a small integer slope
+        dx, dy = random.randint(-2, 2), random.randint(-2, 2)
+        k1, k2 = random.randint(-3, 3), random.randint(-3, 3)
+        return x1 + k1 * dx, y1 + k1 * dy, x1 + k2 * dx, y1 + k2 * dy
+    return x1, y1, random.randrange(size), random.randrange(size)
+
+
+def check_against_scalar(seed: int, size: int, paths: int, segments_per_path: int):
+    random = Random(seed)
+    for _ in range(paths):
+        x1, y1, x2, y2 = random_segment(random, size)
+        path = Path(Node(x1, y1), Node(x2, y2))
+        rows = []
+        for _ in range(segments_per_path):
+            segment = random_segment(random, size)
+            if (random.random() < 0.2):
+                # shares an endpoint with the path
+                end = random.choice([(x1, y1), (x2, y2)])
+                segment = end + segment[2:] if random.random() < 0.5 else segment[:2] + end
+            elif (random.random() < 0.1):
+                # the path itself, reversed or not
+                segment = (x1, y1, x2, y2) if random.random() < 0.5 else (x2, y2, x1, y1)
+            rows.append(segment)
+        segments = np.array(rows, dtype=np.int64)
+        expected = [path.intersect(Path(Node(*row[:2]), Node(*row[2:]))) for row in rows]
+        assert path.intersect_many(segments).tolist() == expected, (x1, y1, x2, y2)
+
+
+def test_intersect_many_matches_intersect_on_small_grid():
+    check_against_scalar(seed=0, size=6, paths=500, segments_per_path=100)
+
+
+def test_intersect_many_matches_intersect_on_large_grid():
+    check_against_scalar(seed=1, size=1000, paths=300, segments_per_path=100)
+
+
+def test_intersect_many_without_segments():
+    path = Path(Node(0, 0), Node(3, 4))
+    assert path.intersect_many(np.empty((0, 4), dtype=np.int64)).tolist() == []
+
+
+def hull_points(points: list):
+    # points on the boundary of the convex hull, collinear ones included
+    ordered = sorted(set(points))
+    if (len(ordered) < 3):
+        return len(ordered)
+    hull = []
+    for sweep in (ordered, ordered[::-1]):
+        chain = []
+        for point in sweep:
+            while (len(chain) >= 2 and orient(*chain[-2], *chain[-1], *point) >= 0):
+                chain.pop()
+            chain.append(point)
+        hull.extend(chain[:-1])
+    corners = hull + hull[:1]
+    return sum(1 for x, y in points if any(
+        orient(x1, y1, x2, y2, x, y) == 0 and min(x1, x2) <= x <= max(x1, x2) and min(y1, y2) <= y <= max(y1, y2)
+        for (x1, y1), (x2, y2) in zip(corners, corners[1:])))
+
+
+def crosses(a: tuple, b: tuple, c: tuple, d: tuple):
+    # exact test for segments ab and cd sharing a point other than a common endpoint
+    o1, o2 = orient(*a, *b, *c), orient(*a, *b, *d)
+    o3, o4 = orient(*c, *d, *a), orient(*c, *d, *b)
+    if (o1 or o2 or o3 or o4):
+        return o1 * o2 < 0 and o3 * o4 < 0 or \
+            any(o == 0 and p not in (a, b) and on_segment(a, b, p) for o, p in ((o1, c), (o2, d))) or \
+            any(o == 0 and p not in (c, d) and on_segment(c, d, p) for o, p in ((o3, a), (o4, b)))
+    # collinear, overlapping in more than a single shared endpoint
+    axis = 0 if a[0] != b[0] else 1
+    low1, high1 = sorted((a[axis], b[axis]))
+    low2, high2 = sorted((c[axis], d[axis]))
+    return max(low1, low2) < min(high1, high2)
+
+
+def on_segment(a: tuple, b: tuple, p: tuple):
+    return min(a[0], b[0]) <= p[0] <= max(a[0], b[0]) and min(a[1], b[1]) <= p[1] <= max(a[1], b[1])
+
+
+def check_triangulation(points: list):
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    edges = delaunay_edges(xs, ys)
+    assert len({tuple(sorted(edge)) for edge in edges}) == len(edges)
+    assert {i for edge in edges for i in edge} == set(range(len(points)))
+    for k, (i, j) in enumerate(edges):
+        for m, n in edges[k + 1:]:
+            assert not crosses(points[i], points[j], points[m], points[n]), \
+                (points[i], points[j], points[m], points[n])
+    return edges
+
+
+@pytest.mark.parametrize('size', range(2, 9))
+def test_delaunay_full_grid(size: int):
+    points = [(x, y) for x in range(size) for y in range(size)]
+    Random(size).shuffle(points)
+    edges = check_triangulation(points)
+    assert len(edges) == 3 * len(points) - 3 - hull_points(points)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_delaunay_dense_random_grid(seed: int):
+    random = Random(seed)
+    points = random.sample([(x, y) for x in range(12) for y in range(12)], 40 + 8 * seed)
+    edges = check_triangulation(points)
+    assert len(edges) == 3 * len(points) - 3 - hull_points(points)
+
+
+@pytest.mark.parametrize('rows', [1, 2, 3])
+def test_delaunay_collinear_rows(rows: int):
+    points = [(x, 5 * y) for x in range(0, 30, 3) for y in range(rows)]
+    Random(rows).shuffle(points)
+    edges = check_triangulation(points)
+    if (rows == 1):
+        # a single line is joined in order along it
+        assert sorted(tuple(sorted((points[i][0], points[j][0]))) for i, j in edges) == \
+            [(x, x + 3) for x in range(0, 27, 3)]
+    else:
+        assert len(edges) == 3 * len(points) - 3 - hull_points(points)
+
+
+def test_delaunay_diagonal_line():
+    points = [(7 * k, 3 * k) for k in range(15)]
+    Random(0).shuffle(points)
+    assert len(check_triangulation(points)) == len(points) - 1
+
+
+def coloured_compact_map(colors_count: int):
+    random.seed('load-arrays')
+    map = Map(40, colors_count)
+    map.random_graph(60, 'delaunay')
+    map.color_min_conflicts(seed=0)
+    compact = map.compact()
+    compact.colors[::7] = -1
+    return compact
+
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_compact_map_round_trip(tmp_path, mmap: bool):
+    compact = coloured_compact_map(5)
+    path = str(tmp_path / 'map.npz')
+    compact.save(path)
+    loaded = CompactMap.load(path, mmap)
+    assert loaded.square_size == compact.square_size
+    assert loaded.colors_count == 5
+    for name in ('x', 'y', 'offsets', 'neighbours', 'colors'):
+        assert np.array_equal(getattr(loaded, name), getattr(compact, name)), name
+        assert getattr(loaded, name).dtype == getattr(compact, name).dtype, name
+    assert isinstance(loaded.x, np.memmap) == mmap
+    # colours are copied, solvers write them even on mapped files
+    assert not isinstance(loaded.colors, np.memmap)
+    assert [list(neighbours) for neighbours in loaded.adjacency()] == \
+        [list(neighbours) for neighbours in compact.adjacency()]
+
+
+def test_load_arrays_rejects_compressed_mmap(tmp_path):
+    path = str(tmp_path / 'compressed.npz')
+    np.savez_compressed(path, x=np.arange(10))
+    assert np.array_equal(load_arrays(path)['x'], np.arange(10))
+    with pytest.raises(ValueError):
+        load_arrays(path, mmap=True)
+
+
+def valid_colouring(map: Map):
+    return all(node.color is not None and 0 <= node.color < map.colors_count and
+               all(neighbour.color != node.color for neighbour in map.graph[node]) for node in map.graph)
+
+
+@pytest.mark.parametrize('average_degree', [3.0, 3.5, 4.0])
+@pytest.mark.parametrize('nogood_limit', [0, 20])
+def test_backjumping_agrees_with_forward_checking(average_degree: float, nogood_limit: int):
+    # small thinned maps on three colours, roughly a third of them cannot be coloured
+    outcomes = set()
+    for seed in range(40):
+        random.seed(f'backjumping-{seed}')
+        map = Map(30, 3)
+        map.random_graph(14, 'delaunay', average_degree)
+        colored = map.color_backtracking_with_forward_checking('mrv')[0] is not None
+        for variable_order in ('input', 'dsatur'):
+            time, _ = map.color_backjumping(variable_order, nogood_limit)
+            assert (time is not None) == colored, (seed, variable_order)
+            if (colored):
+                assert valid_colouring(map), (seed, variable_order)
+        outcomes.add(colored)
+    assert outcomes == {False, True}
+
+
+@pytest.mark.parametrize('colors_count', [3, 4])
+def test_repair_after_edits(colors_count: int):
+    random.seed('repair')
+    map = Map(40, colors_count)
+    map.random_graph(80, 'delaunay', 3.0 if colors_count == 3 else None)
+    map.color_min_conflicts(seed=0)
+    assert valid_colouring(map)
+    edits = Random(colors_count)
+    recoloured = 0
+    for step in range(200):
+        before = {node: node.color for node in map.graph}
+        nodes = list(map.graph)
+        if (step % 2):
+            start_node, end_node = edits.sample(nodes, 2)
+            if (end_node in map.graph[start_node]):
+                continue
+            changed = map.add_path(start_node, end_node, seed=step)
+        else:
+            node = Node(100 + step, edits.randrange(40))
+            changed = map.add_node(node, edits.sample(nodes, edits.randint(1, 3)), seed=step)
+        if (changed is None):
+            # the edit left the map uncolourable, the colours stay as they were
+            assert all(node.color == color for node, color in before.items())
+            if (step % 2):
+                map.remove_path(start_node, end_node)
+            else:
+                map.remove_node(node)
+            continue
+        assert valid_colouring(map), step
+        assert changed == sum(1 for node in map.graph if before.get(node) != node.color), step
+        recoloured += changed
+    # more than the new nodes alone, so Kempe swaps and local searches ran too
+    assert recoloured > 100
+
+
+@pytest.mark.parametrize('method, component_method', [('color_min_conflicts', None),
+                                                      ('color_kernelized', 'color_min_conflicts')])
+def test_chromatic_number_rejects_local_search(method: str, component_method: str):
+    random.seed('chromatic')
+    map = Map(30)
+    map.random_graph(20, 'delaunay')
+    with pytest.raises(ValueError, match='color_min_conflicts'):
+        map.chromatic_number(method, component_method=component_method)
+    assert map.chromatic_number('color_kernelized', component_method='color_backjumping')[0] in (3, 4)
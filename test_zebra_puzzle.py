@@ -0,0 +1,56 @@
+import pytest
+from itertools import permutations, product
+from zebra_puzzle import Orientation, count_solutions, forward_checking_solutions, permutation_model, \
+    random_puzzle, split_search
+
+
+def satisfies(clue: tuple, houses: dict):
+    # houses maps every item to its house
+    if (clue[0] == 'equality'):
+        return houses[clue[1]] == houses[clue[2]]
+    if (clue[0] == 'position'):
+        return houses[clue[2]] == clue[1]
+    distance = houses[clue[2]] - houses[clue[3]]
+    if (clue[1] == Orientation.RIGHT):
+        return distance == 1
+    if (clue[1] == Orientation.LEFT):
+        return distance == -1
+    return abs(distance) == 1
+
+
+def brute_force(puzzle):
+    # every combination of one permutation per category, as forward_checking_solutions
+    # yields them: the options of a category in the order of their houses
+    categories = list(puzzle.categories.items())
+    solutions = []
+    for values in product(*(permutations(options) for _, options in categories)):
+        houses = {(category, option): house
+                  for (category, _), value in zip(categories, values) for house, option in enumerate(value)}
+        if (all(satisfies(clue, houses) for clue in puzzle.clues)):
+            solutions.append(values)
+    return solutions
+
+
+@pytest.mark.parametrize('seed', range(12))
+def test_count_solutions_matches_brute_force(seed: int):
+    # few clues leave several solutions, up to the 6 ** 5 of a puzzle without any
+    puzzle = random_puzzle(3, 5, clues_count=seed, seed=seed)
+    expected = brute_force(puzzle)
+    variables, constraints = permutation_model(puzzle)
+    assert count_solutions(variables, constraints) == len(expected)
+    variables, constraints = permutation_model(puzzle)
+    assert sorted(forward_checking_solutions(variables, constraints)) == sorted(expected)
+    if (len(expected) > 1):
+        variables, constraints = permutation_model(puzzle)
+        assert count_solutions(variables, constraints, limit=2) == 2
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_split_search_matches_sequential(seed: int):
+    puzzle = random_puzzle(4, 4, clues_count=4 + seed, seed=seed)
+    variables, constraints = permutation_model(puzzle)
+    sequential = list(forward_checking_solutions(variables, constraints))
+    assert len(sequential) > 1
+    assert split_search(puzzle, processes=2, parts=5) == sequential
+    assert split_search(puzzle, processes=2, parts=5, count_only=True) == len(sequential)
+    assert split_search(puzzle, processes=2, parts=5, limit=3) == sequential[:3]
@@ -1,16 +1,31 @@
-from itertools import permutations
+import numpy as np
+import tracemalloc
+from collections import deque
+from itertools import islice, permutations
 from enum import Enum
-from time import time_ns
+from multiprocessing import Pool
+from os import cpu_count
+from random import Random
+from time import perf_counter_ns, time_ns
+from solver_stats import SolverStats
 
 class Variable:
     def __init__(self, available_options: list):
-        self.domain = list(permutations(available_options))
+        self.permutations = list(permutations(available_options))
+        # positions[p, k] is the house of the k-th option in the p-th permutation
+        self.positions = np.array([[permutation.index(option) for option in available_options]
+                                   for permutation in self.permutations])
+        self.domain = np.arange(len(self.permutations))
         self.available_options = available_options
-        self.value = None
+        self.index = None
+
+    @property
+    def value(self):
+        return self.permutations[self.index] if self.index is not None else None
 
     def reset(self):
-        self.domain = list(permutations(self.available_options))
-        self.value = None
+        self.domain = np.arange(len(self.permutations))
+        self.index = None
 
 class Orientation(Enum):
     RIGHT = 1
@@ -18,64 +33,131 @@ class Orientation(Enum):
     NEXT_TO = 3
 
 
-def add_constraint(constraint_function: callable, constraints: dict, variable1: Variable, variable2: Variable = None):
-    constraints[variable1].append(constraint_function)
+class Constraint:
+    # Relation between the houses of two items (or of one item and a fixed house),
+    # compiled into columns of the position tables of their variables. Calling it checks
+    # the values of an assignment, a dict from variables to permutation indices, mask()
+    # filters a whole domain at once. The assignment belongs to the search, so several
+    # searches can share the constraints.
+    def __init__(self, relation: callable, variable1: Variable, variable1_value: str,
+                 variable2: Variable = None, variable2_value: str = None):
+        self.relation = relation
+        self.scope = ()
+        self.variable1 = variable1
+        self.variable2 = variable2
+        self.positions1 = variable1.positions[:, variable1.available_options.index(variable1_value)]
+        self.positions2 = None
+        self.static_mask = None
+        if (variable2 is not None):
+            self.positions2 = variable2.positions[:, variable2.available_options.index(variable2_value)]
+        if (variable2 is None or variable2 is variable1):
+            self.static_mask = relation(self.positions1, self.positions2)
+        # plain lists are faster than NumPy for checking a single pair of values
+        self.allowed = self.static_mask.tolist() if self.static_mask is not None else None
+        self.houses1 = self.positions1.tolist()
+        self.houses2 = self.positions2.tolist() if self.positions2 is not None else None
+
+    def __call__(self, assignment: dict):
+        index1 = assignment.get(self.variable1)
+        if (index1 is None):
+            return True
+        if (self.allowed is not None):
+            return self.allowed[index1]
+        index2 = assignment.get(self.variable2)
+        if (index2 is None):
+            return True
+        return self.relation(self.houses1[index1], self.houses2[index2])
+
+    def mask(self, variable: Variable, assignment: dict):
+        # Allowed permutations of the variable given the assigned value of the other one,
+        # None when every permutation is allowed.
+        if (self.static_mask is not None):
+            return self.static_mask
+        if (variable is self.variable1):
+            index2 = assignment.get(self.variable2)
+            if (index2 is None):
+                return None
+            return self.relation(self.positions1, self.positions2[index2])
+        index1 = assignment.get(self.variable1)
+        if (index1 is None):
+            return None
+        return self.relation(self.positions1[index1], self.positions2)
+
+
+def add_constraint(constraint: Constraint, constraints: dict, variable1: Variable, variable2: Variable = None):
+    constraints[variable1].append(constraint)
+    constraint.scope = (variable1,)
     if (variable2 is not None and variable1 != variable2):
-        constraints[variable2].append(constraint_function)
+        constraints[variable2].append(constraint)
+        constraint.scope = (variable1, variable2)
 
 
 def equality_constraint(variable1: Variable, variable1_value: str, variable2: Variable, variable2_value: str):
-    if (variable1.value is None or variable2.value is None):
-        return True
-    return variable1.value.index(variable1_value) == variable2.value.index(variable2_value)
+    return Constraint(lambda position1, position2: position1 == position2,
+                      variable1, variable1_value, variable2, variable2_value)
 
 
 def neighbourhood_constraint(orientation: Orientation, variable1: Variable, variable1_value: str,
                              variable2: Variable, variable2_value: str):
-    if (variable1.value is None or variable2.value is None):
-        return True
     if (orientation == Orientation.RIGHT):
-        return variable1.value.index(variable1_value) - variable2.value.index(variable2_value) == 1
-    if (orientation == Orientation.LEFT):
-        return variable1.value.index(variable1_value) - variable2.value.index(variable2_value) == -1
-    if (orientation == Orientation.NEXT_TO):
-        return abs(variable1.value.index(variable1_value) - variable2.value.index(variable2_value)) == 1
-    raise ValueError("Unknown orientation type")
+        relation = lambda position1, position2: position1 - position2 == 1
+    elif (orientation == Orientation.LEFT):
+        relation = lambda position1, position2: position1 - position2 == -1
+    elif (orientation == Orientation.NEXT_TO):
+        relation = lambda position1, position2: abs(position1 - position2) == 1
+    else:
+        raise ValueError("Unknown orientation type")
+    return Constraint(relation, variable1, variable1_value, variable2, variable2_value)
 
 
 def position_constraint(position: int, variable: Variable, variable_value: str):
-    if (variable.value is None):
-        return True
-    return variable.value.index(variable_value) == position
+    return Constraint(lambda position1, _: position1 == position, variable, variable_value)
+
+
+def allowed_values(variable: Variable, domain: np.ndarray, constraints: list, assignment: dict):
+    allowed = None
+    for constraint in constraints:
+        mask = constraint.mask(variable, assignment)
+        if (mask is not None):
+            allowed = mask if allowed is None else allowed & mask
+    if (allowed is None):
+        return domain
+    return domain[allowed[domain]]
 
 
 def domains_not_empty(variables: list):
     for variable in variables:
-        if (not variable.domain):
+        if (not len(variable.domain)):
             return False
     return True
 
 
-def backtracking(variables: list, constraints: dict):
+def backtracking(variables: list, constraints: dict, stats: SolverStats = None):
     i = 0
+    stats = stats if stats is not None else SolverStats()
+    assignment = {}
     start = time_ns() // 1000000
     while i < len(variables):
-        global iterations
         current_variable = variables[i]
 
-        if (not current_variable.domain):
+        if (not len(current_variable.domain)):
             if (i == 0):
                 print("No solution to the puzzle")
                 break
             current_variable.reset()
+            assignment.pop(current_variable, None)
             i -= 1
+            stats.backtracks += 1
         else:
-            iterations += 1
-            current_variable.value = current_variable.domain[0]
-            del current_variable.domain[0]
+            stats.assignments += 1
+            if (stats.assignments == stats.next_report):
+                stats.report()
+            current_variable.index = int(current_variable.domain[0])
+            current_variable.domain = current_variable.domain[1:]
+            assignment[current_variable] = current_variable.index
             constraints_satisfied = True
             for constraint in constraints[current_variable]:
-                if (not constraint()):
+                if (not constraint(assignment)):
                     constraints_satisfied = False
                     break
             if (constraints_satisfied):
@@ -87,61 +169,379 @@ def backtracking(variables: list, constraints: dict):
 
 
 def adjust_domains(variables: list, constraints: dict, current_variable: Variable):
+    assignment = {variable: variable.index for variable in variables if variable.index is not None}
     for variable in variables:
         if (variable == current_variable):
             continue
-        new_domain = []
-        variable_value = variable.value
-        for option in variable.domain:
-            variable.value = option
-            constraints_satisfied = True
-            for constraint in constraints[variable]:
-                if (not constraint()):
-                    constraints_satisfied = False
-                    break
-            if (constraints_satisfied):
-                new_domain.append(option)
-        variable.domain = new_domain
-        variable.value = variable_value
-
-def backtracking_with_forward_checking(variables: list, constraints: dict, i: int = 0):
-    global iterations
-    global start
-    start = time_ns() / 1000000
+        variable.domain = allowed_values(variable, variable.domain, constraints[variable], assignment)
+
+def backtracking_with_forward_checking(variables: list, constraints: dict, i: int = 0, stats: SolverStats = None):
+    # Stops at the first solution, the variables keep its values.
+    search = forward_checking_search(variables, constraints, stats, i)
+    assignment = next(search, None)
+    if (assignment is None):
+        return False
+    for variable in variables:
+        variable.index = assignment[variable]
+    search.close()
+    return True
+
+
+def forward_checking_solutions(variables: list, constraints: dict, stats: SolverStats = None, i: int = 0):
+    # Yields every solution as a tuple of the values of the variables.
+    for assignment in forward_checking_search(variables, constraints, stats, i):
+        yield tuple(variable.permutations[assignment[variable]] for variable in variables)
+
+
+def forward_checking_search(variables: list, constraints: dict, stats: SolverStats = None, i: int = 0):
+    # Yields the assignment of every solution, a dict from variables to permutation
+    # indices that is only valid until the next one. The assignment and the domains live
+    # in the generator, the variables are only read, so any number of searches can run
+    # over the same model at once. Variables before i keep the values they hold.
+    if (stats is None):
+        stats = SolverStats()
+    assignment = {variable: variable.index for variable in variables[:i]}
+    domains = {variable: variable.domain for variable in variables}
+    if (i == 0):
+        # constraints within a single variable do not depend on any assignment
+        for variable in variables[1:]:
+            domains[variable] = allowed_values(variable, domains[variable],
+                                               [constraint for constraint in constraints[variable]
+                                                if len(constraint.scope) == 1], assignment)
+    yield from extend_assignment(variables, constraints, stats, i, assignment, domains)
+
+
+def extend_assignment(variables: list, constraints: dict, stats: SolverStats, i: int, assignment: dict,
+                      domains: dict):
     if (i == len(variables)):
-        return True
+        yield assignment
+        return
+    future_variables = set(variables[i+1:])
     current_variable = variables[i]
-    for value in current_variable.domain:
-        iterations += 1
-        current_variable.value = value
+    for value in domains[current_variable]:
+        stats.assignments += 1
+        if (stats.assignments == stats.next_report):
+            stats.report()
+        assignment[current_variable] = value
         constraints_satisfied = True
         for constraint in constraints[current_variable]:
-            if (not constraint()):
+            if (not constraint(assignment)):
                 constraints_satisfied = False
                 break
-        domains = {}
         if (constraints_satisfied):
-            for variable in variables[i+1:]:
-                domain = []
-                domains[variable] = variable.domain
-                for val in variable.domain:
-                    variable.value = val
-                    constraints_satisfied = True
-                    for constraint in constraints[variable]:
-                        if (not constraint()):
-                            constraints_satisfied = False
-                            break
-                    if (constraints_satisfied):
-                        domain.append(val)
-                    variable.value = None
-                variable.domain = domain
-            result = backtracking_with_forward_checking(variables, constraints, i + 1)
-            if (result):
+            # only constraints between the assigned variable and a future one can
+            # remove values, the other future domains stay as they are
+            previous = {}
+            if (stats.time_propagation):
+                propagation_start = perf_counter_ns()
+            for constraint in constraints[current_variable]:
+                for variable in constraint.scope:
+                    if (variable in future_variables):
+                        if (variable not in previous):
+                            previous[variable] = domains[variable]
+                        domain = allowed_values(variable, domains[variable], [constraint], assignment)
+                        if (len(domain) != len(domains[variable])):
+                            stats.prunings += 1
+                            domains[variable] = domain
+            if (stats.time_propagation):
+                stats.propagation_time += perf_counter_ns() - propagation_start
+            yield from extend_assignment(variables, constraints, stats, i + 1, assignment, domains)
+            domains.update(previous)
+        del assignment[current_variable]
+    stats.backtracks += 1
+
+
+def count_solutions(variables: list, constraints: dict, stats: SolverStats = None, limit: int = None):
+    # Stops after limit solutions, limit=2 is enough to tell whether a puzzle has a
+    # unique answer.
+    count = 0
+    for _ in forward_checking_solutions(variables, constraints, stats):
+        count += 1
+        if (count == limit):
+            break
+    return count
+
+
+class Puzzle:
+    # Encoding independent description of a puzzle. Items are (category, option) pairs
+    # and clues are ('equality', item1, item2), ('neighbourhood', orientation, item1, item2)
+    # or ('position', house, item).
+    def __init__(self, houses: int, categories: dict, clues: list, solution: dict = None):
+        self.houses = houses
+        self.categories = categories
+        self.clues = clues
+        self.solution = solution
+
+
+def random_puzzle(houses: int, categories_count: int = 5, clues_count: int = None, seed: int = None):
+    # Clues are drawn from a random hidden solution, so the puzzle is always solvable
+    # but the answer does not have to be unique.
+    random = Random(seed)
+    if (clues_count is None):
+        clues_count = houses * categories_count
+    categories = {f'attribute{c}': [f'{c}-{k}' for k in range(houses)] for c in range(categories_count)}
+    solution = {}
+    residents = {}
+    for category, options in categories.items():
+        for option, house in zip(options, random.sample(range(houses), houses)):
+            solution[(category, option)] = house
+            residents[(category, house)] = (category, option)
+    items = list(solution)
+    clues = []
+    while (len(clues) < clues_count):
+        item = random.choice(items)
+        house = solution[item]
+        kind = random.random()
+        if (kind < 0.15):
+            clues.append(('position', house, item))
+        elif (kind < 0.6 and categories_count > 1):
+            category = random.choice([category for category in categories if category != item[0]])
+            clues.append(('equality', item, residents[(category, house)]))
+        elif (houses > 1):
+            other_house = random.choice([h for h in (house - 1, house + 1) if 0 <= h < houses])
+            other = residents[(random.choice(list(categories)), other_house)]
+            if (random.random() < 0.5):
+                orientation = Orientation.NEXT_TO
+            elif (house - other_house == 1):
+                orientation = Orientation.RIGHT
+            else:
+                orientation = Orientation.LEFT
+            clues.append(('neighbourhood', orientation, item, other))
+    return Puzzle(houses, categories, clues, solution)
+
+
+def permutation_model(puzzle: Puzzle):
+    variables = {category: Variable(options) for category, options in puzzle.categories.items()}
+    constraints = {variable: [] for variable in variables.values()}
+    for clue in puzzle.clues:
+        if (clue[0] == 'equality'):
+            (category1, option1), (category2, option2) = clue[1], clue[2]
+            add_constraint(equality_constraint(variables[category1], option1, variables[category2], option2),
+                           constraints, variables[category1], variables[category2])
+        elif (clue[0] == 'neighbourhood'):
+            (category1, option1), (category2, option2) = clue[2], clue[3]
+            add_constraint(neighbourhood_constraint(clue[1], variables[category1], option1,
+                                                    variables[category2], option2),
+                           constraints, variables[category1], variables[category2])
+        else:
+            category, option = clue[2]
+            add_constraint(position_constraint(clue[1], variables[category], option),
+                           constraints, variables[category])
+    return list(variables.values()), constraints
+
+
+def solve_part(job: tuple):
+    # Worker of split_search. Constraints hold lambdas, which cannot be pickled, so every
+    # process builds its own model from the puzzle.
+    puzzle, first_domain, count_only, limit = job
+    variables, constraints = permutation_model(puzzle)
+    variables[0].domain = first_domain
+    stats = SolverStats()
+    solutions = islice(forward_checking_solutions(variables, constraints, stats), limit)
+    result = sum(1 for _ in solutions) if count_only else list(solutions)
+    return result, (stats.assignments, stats.backtracks, stats.prunings)
+
+
+def split_search(puzzle: Puzzle, processes: int = None, count_only: bool = False, limit: int = None,
+                 parts: int = None, stats: SolverStats = None):
+    # Splits the domain of the first variable of the permutation model into parts that
+    # are searched in a process pool. Returns the number of solutions or their list in
+    # the order of the sequential search. With a limit every part stops after that many
+    # and the result is cut to it, stats get the counters of all parts.
+    processes = processes if processes is not None else cpu_count()
+    variables, _ = permutation_model(puzzle)
+    domain = variables[0].domain
+    parts = min(parts if parts is not None else 4 * processes, len(domain))
+    jobs = [(puzzle, part, count_only, limit) for part in np.array_split(domain, parts)]
+    with Pool(processes) as pool:
+        results = pool.map(solve_part, jobs)
+    if (stats is not None):
+        for _, (assignments, backtracks, prunings) in results:
+            stats.assignments += assignments
+            stats.backtracks += backtracks
+            stats.prunings += prunings
+    if (count_only):
+        count = sum(result for result, _ in results)
+        return count if limit is None else min(count, limit)
+    return [solution for result, _ in results for solution in result][:limit]
+
+
+class PositionVariable:
+    # House of a single item, the domain is a bitmask of the houses still possible.
+    def __init__(self, category: str, option: str, houses: int):
+        self.category = category
+        self.option = option
+        self.domain = (1 << houses) - 1
+
+    @property
+    def value(self):
+        if (self.domain and not self.domain & (self.domain - 1)):
+            return self.domain.bit_length() - 1
+        return None
+
+
+class HouseConstraint:
+    # variable1 lives in the house of variable2 moved by one of the shifts.
+    def __init__(self, variable1: PositionVariable, variable2: PositionVariable, shifts: tuple, houses: int):
+        self.variable1 = variable1
+        self.variable2 = variable2
+        self.shifts = shifts
+        self.full = (1 << houses) - 1
+
+    def other(self, variable: PositionVariable):
+        return self.variable2 if variable is self.variable1 else self.variable1
+
+    def support(self, variable: PositionVariable):
+        # Houses of the variable that still have a matching house in the other domain.
+        if (variable is self.variable1):
+            domain, shifts = self.variable2.domain, self.shifts
+        else:
+            domain, shifts = self.variable1.domain, [-shift for shift in self.shifts]
+        mask = 0
+        for shift in shifts:
+            mask |= domain << shift if shift >= 0 else domain >> -shift
+        return mask & self.full
+
+
+SHIFTS = {Orientation.RIGHT: (1,), Orientation.LEFT: (-1,), Orientation.NEXT_TO: (1, -1)}
+
+
+class PositionModel:
+    # One house variable per item instead of one permutation per category. Binary clues
+    # are kept arc consistent and the items of every category must all live in different
+    # houses, so the model grows with the number of items rather than with N!.
+    def __init__(self, puzzle: Puzzle):
+        self.houses = puzzle.houses
+        self.full = (1 << puzzle.houses) - 1
+        self.items = {}
+        self.categories = {}
+        for category, options in puzzle.categories.items():
+            self.categories[category] = []
+            for option in options:
+                variable = PositionVariable(category, option, puzzle.houses)
+                self.items[(category, option)] = variable
+                self.categories[category].append(variable)
+        self.variables = list(self.items.values())
+        self.constraints = {variable: [] for variable in self.variables}
+        for clue in puzzle.clues:
+            if (clue[0] == 'position'):
+                self.items[clue[2]].domain &= 1 << clue[1]
+                continue
+            if (clue[0] == 'equality'):
+                variable1, variable2, shifts = self.items[clue[1]], self.items[clue[2]], (0,)
+            else:
+                variable1, variable2, shifts = self.items[clue[2]], self.items[clue[3]], SHIFTS[clue[1]]
+            constraint = HouseConstraint(variable1, variable2, shifts, puzzle.houses)
+            self.constraints[variable1].append(constraint)
+            self.constraints[variable2].append(constraint)
+
+    def propagate(self, changed: list):
+        queue = deque(changed)
+        queued = set(changed)
+        while (queue):
+            variable = queue.popleft()
+            queued.discard(variable)
+            narrowed = []
+            for constraint in self.constraints[variable]:
+                other = constraint.other(variable)
+                domain = other.domain & constraint.support(other)
+                if (domain != other.domain):
+                    if (not domain):
+                        return False
+                    other.domain = domain
+                    narrowed.append(other)
+            group = self.categories[variable.category]
+            if (not variable.domain & (variable.domain - 1)):
+                for other in group:
+                    if (other is not variable and other.domain & variable.domain):
+                        other.domain &= ~variable.domain
+                        if (not other.domain):
+                            return False
+                        narrowed.append(other)
+            # every house needs an item of the category, a house left to a single item
+            # decides it
+            seen = 0
+            twice = 0
+            for other in group:
+                twice |= seen & other.domain
+                seen |= other.domain
+            if (seen != self.full):
+                return False
+            once = seen & ~twice
+            for other in group:
+                hidden = other.domain & once
+                if (hidden and hidden != other.domain):
+                    if (hidden & (hidden - 1)):
+                        return False
+                    other.domain = hidden
+                    narrowed.append(other)
+            self.stats.prunings += len(narrowed)
+            for other in narrowed:
+                if (other not in queued):
+                    queue.append(other)
+                    queued.add(other)
+        return True
+
+    def solve(self, stats: SolverStats = None):
+        self.stats = stats if stats is not None else SolverStats()
+        if (not self.propagate(self.variables)):
+            return False
+        return self.search()
+
+    def search(self):
+        stats = self.stats
+        undecided = [variable for variable in self.variables if variable.domain & (variable.domain - 1)]
+        if (not undecided):
+            return True
+        variable = min(undecided, key=lambda variable: bin(variable.domain).count('1'))
+        domains = [variable.domain for variable in self.variables]
+        options = variable.domain
+        while (options):
+            house = options & -options
+            options &= options - 1
+            stats.assignments += 1
+            if (stats.assignments == stats.next_report):
+                stats.report()
+            variable.domain = house
+            if (stats.time_propagation):
+                propagation_start = perf_counter_ns()
+                consistent = self.propagate([variable])
+                stats.propagation_time += perf_counter_ns() - propagation_start
+            else:
+                consistent = self.propagate([variable])
+            if (consistent and self.search()):
                 return True
-        current_variable.value = None
-        for variable in domains:
-            variable.domain = domains[variable]
-    return False
+            for other, domain in zip(self.variables, domains):
+                other.domain = domain
+        stats.backtracks += 1
+        return False
+
+    def solution(self):
+        return {item: variable.value for item, variable in self.items.items()}
+
+
+def benchmark(houses_counts: list, categories_count: int = 5, seed: int = 0, permutation_limit: int = 8):
+    # The permutation encoding needs N! values per category, so it is skipped above
+    # permutation_limit houses.
+    for houses in houses_counts:
+        puzzle = random_puzzle(houses, categories_count, seed=seed)
+        for encoding in ('permutations', 'positions'):
+            if (encoding == 'permutations' and houses > permutation_limit):
+                print(f'{houses} houses, {encoding}: skipped')
+                continue
+            stats = SolverStats()
+            tracemalloc.start()
+            start = time_ns() // 1000000
+            if (encoding == 'permutations'):
+                variables, constraints = permutation_model(puzzle)
+                solved = backtracking_with_forward_checking(variables, constraints, stats=stats)
+            else:
+                solved = PositionModel(puzzle).solve(stats)
+            elapsed = time_ns() // 1000000 - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f'{houses} houses, {encoding}: {elapsed}ms, {stats.assignments} iterations, '
+                  f'{peak // 1024}KiB peak memory, solved: {solved}')
 
 
 if (__name__ == '__main__'):
@@ -163,72 +563,75 @@ if (__name__ == '__main__'):
 
     # 1. There are five houses.
     # 2. The Englishman lives in the red house.
-    add_constraint(lambda: equality_constraint(nationality, 'Englishman', house_color, 'red'),
+    add_constraint(equality_constraint(nationality, 'Englishman', house_color, 'red'),
                    constraints, nationality, house_color)
 
     # 3. The Spaniard owns the dog.
-    add_constraint(lambda: equality_constraint(nationality, 'Spaniard', pets, 'dog'),
+    add_constraint(equality_constraint(nationality, 'Spaniard', pets, 'dog'),
                    constraints, nationality, pets)
 
     # 4. Coffee is drunk in the green house.
-    add_constraint(lambda: equality_constraint(drinks, 'coffee', house_color, 'green'),
+    add_constraint(equality_constraint(drinks, 'coffee', house_color, 'green'),
                    constraints, drinks, house_color)
 
     # 5. The Ukrainian drinks tea.
-    add_constraint(lambda: equality_constraint(nationality, 'Ukrainian', drinks, 'tea'),
+    add_constraint(equality_constraint(nationality, 'Ukrainian', drinks, 'tea'),
                    constraints, nationality, drinks)
 
     # 6. The green house is immediately to the right of the ivory house.
-    add_constraint(lambda: neighbourhood_constraint(Orientation.RIGHT, house_color, 'green', house_color, 'ivory'),
+    add_constraint(neighbourhood_constraint(Orientation.RIGHT, house_color, 'green', house_color, 'ivory'),
                    constraints, house_color, house_color)
 
     # 7. The Old Gold smoker owns snails.
-    add_constraint(lambda: equality_constraint(cigarettes, 'Old Golds', pets, 'snails'),
+    add_constraint(equality_constraint(cigarettes, 'Old Golds', pets, 'snails'),
                    constraints, cigarettes, pets)
 
     # 8. Kools are smoked in the yellow house.
-    add_constraint(lambda: equality_constraint(cigarettes, 'Kools', house_color, 'yellow'),
+    add_constraint(equality_constraint(cigarettes, 'Kools', house_color, 'yellow'),
                    constraints, cigarettes, house_color)
 
     # 9. Milk is drunk in the middle house.
-    add_constraint(lambda: position_constraint(2, drinks, 'milk'),
+    add_constraint(position_constraint(2, drinks, 'milk'),
                    constraints, drinks)
 
     # 10. The Norwegian lives in the first house.
-    add_constraint(lambda: position_constraint(0, nationality, 'Norwegian'),
+    add_constraint(position_constraint(0, nationality, 'Norwegian'),
                    constraints, nationality)
 
     # 11. The man who smokes Chesterfields lives in the house next to the man with the fox.
-    add_constraint(lambda: neighbourhood_constraint(Orientation.NEXT_TO, cigarettes, 'Chesterfields', pets, 'fox'),
+    add_constraint(neighbourhood_constraint(Orientation.NEXT_TO, cigarettes, 'Chesterfields', pets, 'fox'),
                    constraints, cigarettes, pets)
 
     # 12. Kools are smoked in the house next to the house where the horse is kept.
-    add_constraint(lambda: neighbourhood_constraint(Orientation.NEXT_TO, cigarettes, 'Kools', pets, 'horse'),
+    add_constraint(neighbourhood_constraint(Orientation.NEXT_TO, cigarettes, 'Kools', pets, 'horse'),
                    constraints, cigarettes, pets)
 
     # 13. The Lucky Strike smoker drinks orange juice.
-    add_constraint(lambda: equality_constraint(cigarettes, 'Lucky Strikes', drinks, 'orange juice'),
+    add_constraint(equality_constraint(cigarettes, 'Lucky Strikes', drinks, 'orange juice'),
                    constraints, cigarettes, drinks)
 
     # 14. The Japanese smokes Parliaments.
-    add_constraint(lambda: equality_constraint(nationality, 'Japanese', cigarettes, 'Parliaments'),
+    add_constraint(equality_constraint(nationality, 'Japanese', cigarettes, 'Parliaments'),
                    constraints, nationality, cigarettes)
 
     # 15. The Norwegian lives next to the blue house.
-    add_constraint(lambda: neighbourhood_constraint(Orientation.NEXT_TO, nationality, 'Norwegian', house_color, 'blue'),
+    add_constraint(neighbourhood_constraint(Orientation.NEXT_TO, nationality, 'Norwegian', house_color, 'blue'),
                    constraints, nationality, house_color)
 
-    global iterations
-    iterations = 0
-    global start
+    stats = SolverStats()
+    start = time_ns() // 1000000
+
+    # benchmark([5, 6, 7, 8, 10, 15, 20, 30])
+
+    # print(f'Solutions: {count_solutions(variables, constraints)}')
 
-    # backtracking(variables, constraints)
+    # backtracking(variables, constraints, stats)
     # for variable in variables:
     #         print(variable.value)
-    # print(f'Iterations: {iterations}')
+    # print(f'Iterations: {stats.assignments}')
 
-    if (backtracking_with_forward_checking(variables, constraints)):
+    if (backtracking_with_forward_checking(variables, constraints, stats=stats)):
         for variable in variables:
             print(variable.value)
-    print(f'Iterations: {iterations}')
+    print(f'Iterations: {stats.assignments}')
     print(f'\nTime of execution of backtracking FC algorithm: {time_ns() // 1000000 - start}ms')